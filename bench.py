@@ -0,0 +1,221 @@
+"""End-to-end benchmark of the bot's report commands against the fake intervals.icu API.
+
+    python bench.py --rosters 1,10,50,100 --weeks 1,4,12 --repeats 5
+
+For every roster size each command is driven through a fake Discord context: once
+against an empty local store (cold), then ``--repeats`` times with the report caches
+cleared (warm store and athlete snapshots). The table shows cold and warm p50/p95 latency, intervals.icu
+calls and kilobytes downloaded per command, and peak Python memory measured with
+tracemalloc in a separate cold pass. ``--json`` writes the same numbers to a file so
+runs can be compared for regressions.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rosters", default="1,10,50,100", help="Comma separated roster sizes")
+    parser.add_argument("--weeks", default="1,4,12", help="Comma separated !summary / !highlights windows")
+    parser.add_argument("--repeats", type=int, default=5, help="Warm runs per command")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake API mean latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Fake API latency standard deviation")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake API calls answered 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction answered 429")
+    parser.add_argument("--client-rate-limit", type=float, default=None,
+                        help="Override ICU_RATE_LIMIT for the bot (requests/s, 0 = unlimited)")
+    parser.add_argument("--stream-bests", action="store_true",
+                        help="Also run !bests with custom durations (downloads every ride's stream when cold)")
+    parser.add_argument("--skip-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    return parser.parse_args()
+
+
+ARGS = parse_args()
+WORKDIR = tempfile.mkdtemp(prefix="ted-bench-")
+
+# ted reads its configuration at import time
+os.environ.setdefault("DISCORD_OWNER_ID", "0")
+os.environ["ACTIVITY_DB_PATH"] = os.path.join(WORKDIR, "activities.db")
+if ARGS.client_rate_limit is not None:
+    os.environ["ICU_RATE_LIMIT"] = str(ARGS.client_rate_limit)
+
+import ted  # noqa: E402
+from fake_icu import FakeIntervals  # noqa: E402
+
+
+class FakeMessage:
+    def __init__(self, content=None, embed=None):
+        self.content = content
+        self.embed = embed
+        self.edits = 0
+        self.deleted = False
+
+    async def delete(self):
+        self.deleted = True
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        self.content = content if content is not None else self.content
+        self.embed = embed if embed is not None else self.embed
+        self.edits += 1
+        return self
+
+
+class FakeAuthor:
+    id = 0
+    name = "bench"
+
+
+class FakeContext:
+    """Just enough of discord.ext.commands.Context for the command callbacks."""
+
+    def __init__(self):
+        self.author = FakeAuthor()
+        self.guild = None
+        self.command = None
+        self.sent = []
+
+    async def send(self, content=None, *, embed=None, **kwargs):
+        message = FakeMessage(content, embed)
+        self.sent.append(message)
+        return message
+
+
+def command_suite(weeks: list) -> list:
+    suite = []
+    for w in weeks:
+        suite.append((f"!summary {w}", lambda ctx, w=w: ted.cmd_summary.callback(ctx, str(w))))
+    for w in weeks:
+        suite.append((f"!highlights {w}", lambda ctx, w=w: ted.cmd_weekly_highlights.callback(ctx, w)))
+    suite.append(("!ytd", lambda ctx: ted.cmd_year_to_date.callback(ctx)))
+    suite.append(("!bests", lambda ctx: ted.cmd_bests.callback(ctx)))
+    suite.append(("!trend 6", lambda ctx: ted.cmd_trend.callback(ctx, 6)))
+    if ARGS.stream_bests:
+        suite.append(("!bests 90s 7m", lambda ctx: ted.cmd_bests.callback(ctx, "90s", "7m")))
+    return suite
+
+
+def reset_bot_state(tag: str):
+    """Point the bot at a fresh, empty store and drop every in-memory cache."""
+    path = os.path.join(WORKDIR, f"{tag}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    ted.activity_store = ted.ActivityStore(path)
+    ted.power_curve_cache = ted.PowerCurveCache(ted.activity_store, ted.CURVE_CACHE_BYTES)
+    # Snapshots never expire here so warm runs do not depend on how long the cold pass took
+    ted.athlete_snapshots = ted.SnapshotRegistry(float("inf"))
+    # Commands run outside a guild, so they always get the default roster set_roster fills
+    ted.rosters = ted.RosterRegistry(ted.activity_store, ted.ATHLETE_IDS)
+    clear_report_cache()
+
+
+def clear_report_cache():
+    # Rendered text is dropped too, so warm runs still aggregate and format every report
+    ted.report_flights = ted.SingleFlight()
+    ted.render_cache = ted.RenderCache(ted.RENDER_CACHE_ENTRIES)
+
+
+def set_roster(size: int):
+    ted.ATHLETE_IDS.clear()
+    ted.ATHLETE_IDS.update({f"i{100000 + n}": f"Athlete{n}" for n in range(size)})
+
+
+async def run_command(fake: FakeIntervals, command) -> dict:
+    fake.reset_stats()
+    started = time.perf_counter()
+    await command(FakeContext())
+    elapsed = time.perf_counter() - started
+    # Background fetches a command starts (e.g. curve warm-up) are charged to it
+    if ted._background_tasks:
+        await asyncio.gather(*list(ted._background_tasks), return_exceptions=True)
+    return {"seconds": elapsed, "calls": sum(v for k, v in fake.calls.items() if k.startswith("/")),
+            "bytes": fake.bytes_sent}
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+async def bench_roster(fake: FakeIntervals, size: int, suite: list) -> list:
+    set_roster(size)
+    results = []
+
+    reset_bot_state(f"roster{size}")
+    cold = {}
+    for name, command in suite:
+        cold[name] = await run_command(fake, command)
+
+    warm = {name: [] for name, _ in suite}
+    for _ in range(ARGS.repeats):
+        for name, command in suite:
+            clear_report_cache()
+            warm[name].append(await run_command(fake, command))
+
+    peak = {}
+    if not ARGS.skip_memory:
+        reset_bot_state(f"roster{size}-memory")
+        tracemalloc.start()
+        for name, command in suite:
+            tracemalloc.reset_peak()
+            await run_command(fake, command)
+            peak[name] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    for name, _ in suite:
+        warm_seconds = [run["seconds"] for run in warm[name]] or [cold[name]["seconds"]]
+        results.append({
+            "roster": size,
+            "command": name,
+            "cold_ms": cold[name]["seconds"] * 1000,
+            "warm_p50_ms": percentile(warm_seconds, 50) * 1000,
+            "warm_p95_ms": percentile(warm_seconds, 95) * 1000,
+            "cold_calls": cold[name]["calls"],
+            "warm_calls": sum(run["calls"] for run in warm[name]) / max(1, len(warm[name])),
+            "cold_kb": cold[name]["bytes"] / 1024,
+            "peak_mb": peak[name] / 2 ** 20 if name in peak else None,
+        })
+    return results
+
+
+def print_table(results: list):
+    header = f"{'Roster':>6} | {'Command':<15} | {'Cold ms':>9} | {'p50 ms':>8} | {'p95 ms':>8} | " \
+             f"{'Calls':>6} | {'Warm calls':>10} | {'KB down':>9} | {'Peak MB':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        peak = f"{r['peak_mb']:.1f}" if r["peak_mb"] is not None else "-"
+        print(f"{r['roster']:>6} | {r['command']:<15} | {r['cold_ms']:>9.1f} | {r['warm_p50_ms']:>8.1f} | "
+              f"{r['warm_p95_ms']:>8.1f} | {r['cold_calls']:>6} | {r['warm_calls']:>10.1f} | "
+              f"{r['cold_kb']:>9.1f} | {peak:>7}")
+
+
+async def main():
+    fake = FakeIntervals(ARGS.latency, ARGS.jitter, ARGS.error_rate, ARGS.rate_limit_rate)
+    ted.API_BASE_URL = fake.start_in_thread()
+    suite = command_suite([int(w) for w in ARGS.weeks.split(",")])
+
+    results = []
+    try:
+        for size in [int(n) for n in ARGS.rosters.split(",")]:
+            print(f"Benchmarking roster of {size}...", file=sys.stderr)
+            results.extend(await bench_roster(fake, size, suite))
+    finally:
+        await ted.close_http_session()
+
+    print_table(results)
+    if ARGS.json_path:
+        with open(ARGS.json_path, "w") as f:
+            json.dump({"args": vars(ARGS), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,284 @@
+"""Local stand-in for the intervals.icu API, for benchmarking the bot without the real service.
+
+Serves deterministic synthetic activities, power streams, per-activity power curves and
+athlete power curves for any athlete id, with configurable latency and error rates. Run
+it on its own:
+
+    python fake_icu.py --port 8765 --latency 0.08 --error-rate 0.02
+
+then point the bot at it by setting ``ted.API_BASE_URL`` to ``http://127.0.0.1:8765/api/v1``,
+or start it in-process with ``FakeIntervals().start_in_thread()`` as bench.py does.
+"""
+import argparse
+import asyncio
+import functools
+import random
+import threading
+import zlib
+from collections import Counter
+from datetime import date, timedelta
+
+import numpy as np
+from aiohttp import web
+
+CURVE_SECS = [1, 2, 5, 10, 15, 20, 30, 60, 120, 180, 300, 480, 600, 900, 1200, 1800, 2400, 3600, 5400, 7200]
+ALL_TIME_DAYS = 3 * 365  # History covered by the "all" athlete curve
+ACTIVITY_TYPES = ["Ride", "Ride", "VirtualRide", "Run", "Walk", "WeightTraining"]
+
+
+def _rng(*parts) -> random.Random:
+    return random.Random(zlib.crc32(":".join(str(p) for p in parts).encode()))
+
+
+class SyntheticAthlete:
+    """Deterministic training history for one athlete id."""
+
+    def __init__(self, athlete_id: str, activity_chance: float = 0.7):
+        rng = _rng("athlete", athlete_id)
+        self.athlete_id = athlete_id
+        self.activity_chance = activity_chance
+        self.weight = round(rng.uniform(55, 95), 1)
+        self.ftp = rng.randint(180, 380)
+        self.w_prime = rng.randint(12000, 28000)
+        self.max_hr = rng.randint(175, 205)
+
+    def activity_id(self, day: date) -> str:
+        return f"{self.athlete_id}-{day.toordinal()}"
+
+    def has_activity(self, day: date) -> bool:
+        return _rng("day", self.athlete_id, day.toordinal()).random() < self.activity_chance
+
+    def activity(self, day: date) -> dict:
+        rng = _rng("activity", self.athlete_id, day.toordinal())
+        activity_type = rng.choice(ACTIVITY_TYPES)
+        moving_time = rng.randint(1200, 5 * 3600)
+        intensity = rng.uniform(0.55, 0.95)
+        average_watts = round(self.ftp * intensity * rng.uniform(0.85, 0.97))
+        ctl = round(40 + 25 * (1 + ((day.toordinal() % 120) - 60) / 60), 2)
+        zones = [rng.randint(0, moving_time // 3) for _ in range(7)]
+        cycling = activity_type in ("Ride", "VirtualRide")
+        return {
+            "id": self.activity_id(day),
+            "start_date_local": f"{day.isoformat()}T{rng.randint(5, 20):02d}:{rng.randint(0, 59):02d}:00",
+            "type": activity_type,
+            "name": f"Synthetic {activity_type}",
+            "description": "x" * rng.randint(0, 400),
+            "distance": round(moving_time * rng.uniform(2.5, 10.0), 1),
+            "moving_time": moving_time,
+            "elapsed_time": moving_time + rng.randint(0, 900),
+            "total_elevation_gain": rng.randint(0, 2500),
+            "icu_training_load": round(moving_time / 3600 * intensity ** 2 * 100),
+            "icu_weighted_avg_watts": round(self.ftp * intensity) if cycling else None,
+            "icu_average_watts": average_watts if cycling else None,
+            "icu_weight": self.weight,
+            "icu_ctl": ctl,
+            "icu_atl": round(ctl * rng.uniform(0.8, 1.3), 2),
+            "icu_pm_ftp": round(self.ftp * rng.uniform(0.95, 1.05)) if cycling else None,
+            "icu_ftp": self.ftp,
+            "icu_hr_zone_times": zones,
+            "icu_power_zone_times": [rng.randint(0, 600) for _ in range(7)] if cycling else None,
+            "average_heartrate": rng.randint(110, 160),
+            "max_heartrate": rng.randint(150, self.max_hr),
+            "athlete_max_hr": self.max_hr,
+            "average_cadence": rng.uniform(70, 95),
+            "calories": rng.randint(200, 3000),
+            "icu_intensity": round(intensity * 100, 1),
+            "analyzed": f"{day.isoformat()}T23:00:00Z",
+            "device_name": "Synthetic Head Unit",
+            "gear": {"id": "b1", "name": "Bike", "distance": 12345678},
+        }
+
+    def activities(self, oldest: date, newest: date) -> list:
+        # Newest first, like intervals.icu. History starts ALL_TIME_DAYS ago.
+        oldest = max(oldest, date.today() - timedelta(days=ALL_TIME_DAYS))
+        days = (newest - oldest).days
+        return [
+            self.activity(newest - timedelta(days=offset))
+            for offset in range(days + 1)
+            if self.has_activity(newest - timedelta(days=offset))
+        ]
+
+    def power_stream(self, day: date) -> np.ndarray:
+        """1 Hz watts for the activity: steady riding with a few hard efforts of various lengths."""
+        activity = self.activity(day)
+        n = activity["moving_time"]
+        rng = np.random.default_rng(zlib.crc32(f"stream:{self.athlete_id}:{day.toordinal()}".encode()))
+        intensity = activity["icu_intensity"] / 100
+        watts = self.ftp * intensity * rng.uniform(0.7, 1.05, n)
+        for _ in range(rng.integers(2, 7)):
+            length = int(rng.choice([8, 15, 30, 60, 180, 300, 600, 1200]))
+            if length >= n:
+                continue
+            start = int(rng.integers(0, n - length))
+            target = min(self.ftp * 4.0, self.w_prime / length + self.ftp) * rng.uniform(0.8, 1.02)
+            watts[start:start + length] = target * rng.uniform(0.9, 1.1, length)
+        return np.rint(watts).astype(np.int32)
+
+    @functools.lru_cache(maxsize=4096)
+    def activity_curve(self, day: date) -> list:
+        """Best power for each CURVE_SECS duration in the activity's stream (0 past its length)."""
+        totals = np.concatenate(([0], np.cumsum(self.power_stream(day), dtype=np.int64)))
+        return [
+            round(int(np.max(totals[secs:] - totals[:-secs])) / secs) if secs < len(totals) else 0
+            for secs in CURVE_SECS
+        ]
+
+    @functools.lru_cache(maxsize=64)
+    def range_curve(self, oldest: date, newest: date) -> list:
+        best = [0] * len(CURVE_SECS)
+        for activity in self.activities(oldest, newest):
+            if activity["type"] not in ("Ride", "VirtualRide"):
+                continue
+            day = date.fromordinal(int(activity["id"].rsplit("-", 1)[1]))
+            best = [max(a, b) for a, b in zip(best, self.activity_curve(day))]
+        return best
+
+
+class FakeIntervals:
+    """The fake API as an aiohttp application, with call accounting for benchmarks."""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, activity_chance: float = 0.7, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.activity_chance = activity_chance
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.bytes_sent = 0
+        self._athletes = {}
+        self._runner = None
+
+        self.app = web.Application(middlewares=[self._faults])
+        self.app.router.add_get("/api/v1/athlete/{athlete_id}/activities", self.get_activities)
+        self.app.router.add_get("/api/v1/activity/{activity_id}/power-curve", self.get_activity_power_curve)
+        self.app.router.add_get("/api/v1/activity/{activity_id}/streams", self.get_activity_streams)
+        self.app.router.add_get("/api/v1/athlete/{athlete_id}/power-curves", self.get_athlete_power_curves)
+        self.app.router.add_get("/_stats", self.get_stats)
+
+    def athlete(self, athlete_id: str) -> SyntheticAthlete:
+        if athlete_id not in self._athletes:
+            self._athletes[athlete_id] = SyntheticAthlete(athlete_id, self.activity_chance)
+        return self._athletes[athlete_id]
+
+    def reset_stats(self):
+        self.calls.clear()
+        self.bytes_sent = 0
+
+    @web.middleware
+    async def _faults(self, request, handler):
+        if request.path.startswith("/_"):
+            return await handler(request)
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        self.calls[route] += 1
+        await asyncio.sleep(max(0.0, self.random.gauss(self.latency, self.jitter)))
+
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            self.calls["429"] += 1
+            return web.Response(status=429, text="Too Many Requests", headers={"Retry-After": "1"})
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.calls["5xx"] += 1
+            return web.Response(status=503, text="Service Unavailable")
+
+        response = await handler(request)
+        self.bytes_sent += len(response.body or b"")
+        return response
+
+    async def get_activities(self, request):
+        oldest = date.fromisoformat(request.query["oldest"][:10])
+        newest = date.fromisoformat(request.query["newest"][:10])
+        activities = self.athlete(request.match_info["athlete_id"]).activities(oldest, newest)
+        fields = request.query.get("fields")
+        if fields:
+            keep = set(fields.split(","))
+            activities = [{k: v for k, v in activity.items() if k in keep} for activity in activities]
+        return web.json_response(activities)
+
+    async def get_activity_power_curve(self, request):
+        athlete_id, _, ordinal = request.match_info["activity_id"].rpartition("-")
+        if not athlete_id or not ordinal.isdigit():
+            return web.Response(status=404, text="Activity not found")
+        values = list(self.athlete(athlete_id).activity_curve(date.fromordinal(int(ordinal))))
+        return web.json_response({"secs": CURVE_SECS, "values": values})
+
+    async def get_activity_streams(self, request):
+        athlete_id, _, ordinal = request.match_info["activity_id"].rpartition("-")
+        if not athlete_id or not ordinal.isdigit():
+            return web.Response(status=404, text="Activity not found")
+        day = date.fromordinal(int(ordinal))
+        athlete = self.athlete(athlete_id)
+        types = request.query.get("types", "watts").split(",")
+        streams = []
+        if "watts" in types and athlete.activity(day)["type"] in ("Ride", "VirtualRide"):
+            streams.append({"type": "watts", "data": athlete.power_stream(day).tolist()})
+        return web.json_response(streams)
+
+    async def get_athlete_power_curves(self, request):
+        athlete = self.athlete(request.match_info["athlete_id"])
+        spec = request.query.get("curves", "all")
+        today = date.today()
+        if spec.startswith("r."):
+            _, oldest, newest = spec.split(".")
+            oldest, newest = date.fromisoformat(oldest), date.fromisoformat(newest)
+        elif spec.endswith("d") and spec[:-1].isdigit():
+            oldest, newest = today - timedelta(days=int(spec[:-1])), today
+        else:
+            oldest, newest = today - timedelta(days=ALL_TIME_DAYS), today
+        values = list(athlete.range_curve(oldest, newest))
+        return web.json_response({"list": [{"id": spec, "secs": CURVE_SECS, "values": values, "weight": athlete.weight}]})
+
+    async def get_stats(self, request):
+        return web.json_response({"calls": dict(self.calls), "bytes_sent": self.bytes_sent})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve in the running event loop; returns the API base URL."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{bound_port}/api/v1"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve from a background thread with its own event loop, so the server's work
+        does not run on (and get measured as part of) the client's loop."""
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+        result = {}
+
+        def serve():
+            asyncio.set_event_loop(loop)
+            result["url"] = loop.run_until_complete(self.start(host, port))
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=serve, name="fake-icu", daemon=True).start()
+        started.wait()
+        self._loop = loop
+        return result["url"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Standard deviation of the delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction answered with 429")
+    args = parser.parse_args()
+
+    fake = FakeIntervals(args.latency, args.jitter, args.error_rate, args.rate_limit_rate)
+    print(f"Fake intervals.icu API on http://{args.host}:{args.port}/api/v1")
+    web.run_app(fake.app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,30 @@
 import os
+import re
+import json
+import math
+import time
+import pickle
+import bisect
+import hashlib
+import random
+import zlib
+import codecs
+import struct
+import sqlite3
+import asyncio
+import functools
+import threading
+import contextlib
+import contextvars
+import multiprocessing
+import concurrent.futures
+from collections import OrderedDict
+import aiohttp
+import numpy as np
 import discord
-from discord.ext import commands
-from datetime import datetime, timedelta
-import requests
-from requests.auth import HTTPBasicAuth
+from discord.ext import commands, tasks
+from datetime import date, datetime, timedelta
+from email.utils import parsedate_to_datetime
 
 import os
 from dotenv import load_dotenv  # Import dotenv to read the .env file
@@ -23,164 +44,2129 @@ OWNER_ID = int(os.environ.get("DISCORD_OWNER_ID", "YOUR_USER_ID"))  # Replace "Y
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True  # Required for fetching user objects
-bot = commands.Bot(command_prefix="!", intents=intents)
+
+
+class TedBot(commands.Bot):
+    async def setup_hook(self):
+        # Runs before the gateway connects, so the first command already sees the restored caches
+        if WARM_STATE_PATH:
+            await load_warm_state()
+
+    async def close(self):
+        if METRICS_PATH:
+            write_metrics_file()
+        if WARM_STATE_PATH:
+            try:
+                write_warm_state(collect_warm_state())
+            except (OSError, pickle.PicklingError) as e:
+                print(f"❌ Saving warm state to {WARM_STATE_PATH} failed: {e}")
+        await close_http_session()
+        close_compute_pool()
+        await super().close()
+
+    async def on_command(self, ctx):
+        ctx.started_at = time.perf_counter()
+        report_warmer.note_command()
+
+    async def on_command_completion(self, ctx):
+        observe_command(ctx, "ok")
+
+    async def on_command_error(self, ctx, error):
+        observe_command(ctx, "error")
+        original = getattr(error, "original", error)
+        if isinstance(original, IntervalsAPIError):
+            print(f"❌ {ctx.command} failed: {original}")
+            await ctx.send("⚠️ intervals.icu is not answering right now, so I can't build that report. "
+                           "Please try again in a minute.")
+            return
+        await super().on_command_error(ctx, error)
+
+
+bot = TedBot(command_prefix="!", intents=intents)
 
 API_BASE_URL = "https://intervals.icu/api/v1"
+HTTP_TIMEOUT = float(os.getenv("ICU_HTTP_TIMEOUT", "30"))  # Seconds for a whole request
+HTTP_CONNECT_TIMEOUT = float(os.getenv("ICU_HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_POOL_SIZE = int(os.getenv("ICU_HTTP_POOL_SIZE", "20"))  # Max open connections to intervals.icu
+HTTP_KEEPALIVE = float(os.getenv("ICU_HTTP_KEEPALIVE", "60"))  # Seconds an idle connection is kept
+FETCH_CONCURRENCY = int(os.getenv("ICU_FETCH_CONCURRENCY", "8"))  # Athletes fetched in parallel per report
+CURVE_WARMUP_CONCURRENCY = int(os.getenv("CURVE_WARMUP_CONCURRENCY", "2"))  # Ride streams fetched at once in the background
+CURVE_WARMUP_LIMIT = int(os.getenv("CURVE_WARMUP_LIMIT", "200"))  # Ride streams queued for background download at a time
+RATE_LIMIT = float(os.getenv("ICU_RATE_LIMIT", "10"))  # Requests per second to intervals.icu (0 = unlimited)
+RATE_BURST = int(os.getenv("ICU_RATE_BURST", "20"))  # Requests allowed back-to-back before the rate applies
+BACKGROUND_RATE_SHARE = float(os.getenv("ICU_BACKGROUND_SHARE", "0.3"))  # Most of ICU_RATE_LIMIT background downloads may use
+MAX_RETRIES = int(os.getenv("ICU_MAX_RETRIES", "4"))  # Retries for 429/5xx responses and network errors
+BACKOFF_BASE = float(os.getenv("ICU_BACKOFF_BASE", "0.5"))  # First retry waits up to this many seconds
+BACKOFF_MAX = float(os.getenv("ICU_BACKOFF_MAX", "30"))  # Longest wait between retries
+
+ACTIVITY_DB_PATH = os.getenv("ACTIVITY_DB_PATH", "activities.db")
+SYNC_RECHECK_DAYS = int(os.getenv("ACTIVITY_RECHECK_DAYS", "3"))  # Recent days re-fetched in case activities were edited
+SYNC_MIN_INTERVAL = float(os.getenv("ACTIVITY_SYNC_INTERVAL", "120"))  # Seconds before the recent days are checked again
+CURVE_CACHE_BYTES = int(os.getenv("CURVE_CACHE_BYTES", str(16 * 1024 * 1024)))  # In-memory budget for activity power curves
+BESTS_HISTORY_START = os.getenv("BESTS_HISTORY_START", "2010-01-01")  # Oldest rides searched by !bests <durations>
+MAX_CUSTOM_BESTS = 8  # Durations per !bests request; each adds two embed fields (limit 25)
+DISCORD_MESSAGE_LIMIT = 2000  # Characters per Discord message; longer reports are sent in several
+MAX_TREND_WEEKS = 104  # Longest !trend window
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "60"))  # Seconds a finished report is reused for identical requests
+REPORT_MAX_STALENESS = float(os.getenv("REPORT_MAX_STALENESS", "1800"))  # Seconds a pre-built report may be served
+RENDER_CACHE_ENTRIES = int(os.getenv("RENDER_CACHE_ENTRIES", "64"))  # Rendered reports kept by data fingerprint
+SNAPSHOT_TTL = float(os.getenv("ATHLETE_SNAPSHOT_TTL", str(SYNC_MIN_INTERVAL)))  # Seconds an athlete snapshot is reused
+SNAPSHOT_WEEKS = int(os.getenv("ATHLETE_SNAPSHOT_WEEKS", "12"))  # Snapshots cover at least this far back (and the year)
+STREAM_EDIT_INTERVAL = float(os.getenv("REPORT_STREAM_EDIT_INTERVAL", "1.2"))  # Min seconds between edits of a streamed report
+WARM_INTERVAL = float(os.getenv("REPORT_WARM_INTERVAL", "900"))  # Seconds between background report refreshes
+WARM_QUIET_PERIOD = float(os.getenv("REPORT_WARM_QUIET", "120"))  # Also refresh once commands have been quiet this long
+WARM_SUMMARY_WEEKS = [int(w) for w in os.getenv("REPORT_WARM_SUMMARY_WEEKS", "1,4").split(",") if w.strip()]
+WARM_HIGHLIGHT_WEEKS = [int(w) for w in os.getenv("REPORT_WARM_HIGHLIGHT_WEEKS", "1").split(",") if w.strip()]
+COMPUTE_POOL = os.getenv("COMPUTE_POOL", "thread")  # Where report aggregation/rendering runs: thread, process or inline
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", "2"))  # Workers in the compute pool
+METRICS_PATH = os.getenv("METRICS_PATH", "")  # Prometheus text file written periodically (empty = off)
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "60"))  # Seconds between metrics file writes
+WARM_STATE_PATH = os.getenv("WARM_STATE_PATH", "warm_state.bin")  # In-memory caches saved here for fast restarts (empty = off)
+WARM_STATE_INTERVAL = float(os.getenv("WARM_STATE_INTERVAL", "600"))  # Seconds between warm state saves
+WARM_STATE_MAX_AGE = float(os.getenv("WARM_STATE_MAX_AGE", "86400"))  # Saved state older than this is ignored at startup
+WARM_STATE_GRACE = float(os.getenv("WARM_STATE_GRACE", "300"))  # Min seconds restored reports are served while rebuilt
 #TEST AV AUTOUPDATE!!
 # TEST 2 av auto!
 # =========================
 # Parse ATHLETE_IDS from the environment
 # =========================
+# ATHLETE_ID_1, ATHLETE_ID_2, ... ("<athlete id>=<name>", any number of them) make up the
+# default roster, used by servers that have not set up their own with !roster.
 ATHLETE_IDS = {}
-for i in range(1, 20):  # Support up to 20 athletes (can be increased as needed)
-    athlete_entry = os.getenv(f"ATHLETE_ID_{i}")
-    if athlete_entry:
-        athlete_id, athlete_name = athlete_entry.split("=")
-        ATHLETE_IDS[athlete_id] = athlete_name
+for key in sorted((key for key in os.environ if re.fullmatch(r"ATHLETE_ID_\d+", key)), key=lambda key: int(key[11:])):
+    athlete_id, athlete_name = os.environ[key].split("=", 1)
+    ATHLETE_IDS[athlete_id] = athlete_name
 
 CYCLING_TYPES = {"Ride", "VirtualRide"}
 INCLUDED_TYPES = CYCLING_TYPES | {"Run"}
 
 # =========================
-# Data Fetching and Processing Functions
+# Performance Instrumentation
 # =========================
+# Counters and latency histograms for commands, report builds and their stages,
+# intervals.icu requests and the caches. The owner can read them with !stats, and with
+# METRICS_PATH set they are written there in Prometheus text format for long-term tracking.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # The last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating within the bucket it falls in."""
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n >= rank:
+                lower = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+                upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return 0.0
+
+
+class Stopwatch:
+    """Times consecutive stages of one report build: ``lap("fetch")``, ``lap("format")``..."""
+
+    def __init__(self, registry, report: str):
+        self.registry = registry
+        self.report = report
+        self.last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.registry.observe("ted_report_stage_seconds", now - self.last, report=self.report, stage=stage)
+        self.last = now
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+        self._lock = threading.Lock()  # Cache lookups report from worker threads
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def timed(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def stopwatch(self, report: str) -> Stopwatch:
+        return Stopwatch(self, report)
+
+    def total(self, name: str, **match) -> float:
+        """Sum of a counter over every label set that includes ``match``."""
+        wanted = set(match.items())
+        with self._lock:
+            return sum(v for (n, labels), v in self.counters.items() if n == name and wanted <= set(labels))
+
+    def series(self, name: str) -> list:
+        """(labels dict, Histogram) for every label set of a histogram, sorted by labels."""
+        with self._lock:
+            matching = sorted((labels, h) for (n, labels), h in self.histograms.items() if n == name)
+        return [(dict(labels), h) for labels, h in matching]
+
+    def prometheus(self) -> str:
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{fmt(labels)} {value:g}")
+        for (name, labels), h in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS + (float("inf"),), h.buckets):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{name}_bucket{fmt(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{fmt(labels)} {h.sum:.6f}")
+            lines.append(f"{name}_count{fmt(labels)} {h.count}")
+        lines.append(f"ted_start_time_seconds {self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def observe_command(ctx, outcome: str):
+    started = getattr(ctx, "started_at", None)
+    if started is not None and ctx.command is not None:
+        metrics.observe("ted_command_seconds", time.perf_counter() - started,
+                        command=ctx.command.qualified_name, outcome=outcome)
+
+
+def write_metrics_file(path: str = None):
+    path = path or METRICS_PATH
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(metrics.prometheus())
+    # Swap the whole file in so a scraper never reads a half-written one
+    os.replace(tmp_path, path)
 
-def get_activities(athlete_id: str, oldest_date: str, newest_date: str) -> list:
-    url = f"{API_BASE_URL}/athlete/{athlete_id}/activities"
-    params = {"oldest": oldest_date, "newest": newest_date}
-    auth = HTTPBasicAuth('API_KEY', API_KEY)
-    response = requests.get(url, auth=auth, params=params)
-    if response.status_code == 200:
-        return response.json()
-    return []
-
-def get_activity_power_curve(activity_id: str) -> dict:
-    url = f"{API_BASE_URL}/activity/{activity_id}/power-curve"
-    auth = HTTPBasicAuth('API_KEY', API_KEY)
-    response = requests.get(url, auth=auth)
-    if response.status_code == 200:
-        return response.json()
-    return {}
-
-def get_best_effort_power(power_curve_data: dict, target_duration: int) -> float:
-    secs = power_curve_data.get("secs", [])
-    values = power_curve_data.get("values", [])
-    if target_duration in secs:
-        idx = secs.index(target_duration)
-        return values[idx] if idx < len(values) else 0.0
-    return 0.0
-
-def process_activities(activities: list, weeksago: int) -> dict:
-    total_distance = 0
-    total_duration = 0
-    total_training_load = 0
-    max_normalized_power = 0
-    max_avg_power = 0
-    max_normalized_power_per_kg = 0
-    max_avg_power_per_kg = 0
-    max_pm_ftp = 0
-    hr_zone_times = [0] * 5
-    ctl_start = None
-    ctl_end = None
-
-    for activity in activities:
-        if activity.get("type") not in INCLUDED_TYPES:
-            continue
 
-        weight = activity.get("icu_weight", 0) or 0
-        ctl = activity.get("icu_ctl", None)
+# =========================
+# Rate Limiting and Retries
+# =========================
+# Every request takes a token from a shared bucket and a slot under an adaptive
+# concurrency limit. A 429 halves the limit and pauses the bucket for Retry-After;
+# successes grow the limit back one step at a time. 429/5xx and network errors are
+# retried with jittered exponential backoff and raise IntervalsAPIError once retries
+# run out, so a throttled report fails loudly instead of filling up with zeros.
+# Background downloads (see _background_fetch) only get a slot or a token while no
+# command request is waiting for one, and at most BACKGROUND_RATE_SHARE of the rate.
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class IntervalsAPIError(Exception):
+    def __init__(self, path: str, reason: str):
+        super().__init__(f"GET {path} failed: {reason}")
+        self.path = path
+        self.reason = reason
+
+
+class AdaptiveThrottle:
+    BACKGROUND_POLL = 0.05  # Seconds a background request waits before looking again
+
+    def __init__(self, rate: float, burst: int, max_concurrency: int, background_share: float):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.active = 0
+        self.waiting = 0  # Foreground requests waiting for a slot or a token
+        self.background_rate = rate * max(0.0, min(1.0, background_share))
+        self.background_tokens = 1.0
+        self.background_updated = self.updated
+        self._slots = asyncio.Condition()
+
+    async def acquire(self, background: bool = False):
+        if not background:
+            self.waiting += 1
+        try:
+            async with self._slots:
+                await self._slots.wait_for(
+                    lambda: self.active < int(self.limit) and not (background and self.waiting)
+                )
+                self.active += 1
+            try:
+                await self._take_token(background)
+            except BaseException:
+                # Cancelled while waiting: hand the slot back without touching the adaptive limit
+                self.active -= 1
+                async with self._slots:
+                    self._slots.notify_all()
+                raise
+        finally:
+            if not background:
+                self.waiting -= 1
+
+    async def _take_token(self, background: bool):
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            if background and self.waiting:
+                await asyncio.sleep(self.BACKGROUND_POLL)
+                continue
+            if self.rate <= 0:
+                return
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if not background:
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
 
-        if ctl is not None:
-            if ctl_start is None:
-                ctl_start = ctl
-            ctl_end = ctl
+            if self.background_rate <= 0:
+                await asyncio.sleep(self.BACKGROUND_POLL)
+                continue
+            self.background_tokens = min(
+                1.0, self.background_tokens + (now - self.background_updated) * self.background_rate
+            )
+            self.background_updated = now
+            if self.tokens >= 1 and self.background_tokens >= 1:
+                self.tokens -= 1
+                self.background_tokens -= 1
+                return
+            await asyncio.sleep(max((1 - self.tokens) / self.rate,
+                                    (1 - self.background_tokens) / self.background_rate))
+
+    async def release(self, throttled: bool):
+        async with self._slots:
+            self.active -= 1
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._slots.notify_all()
 
-        total_distance += activity.get("distance", 0) or 0
-        total_duration += activity.get("moving_time", 0) or 0
-        total_training_load += activity.get("icu_training_load", 0) or 0
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
 
-        if activity.get("type") in CYCLING_TYPES:
-            normalized_power = activity.get("icu_weighted_avg_watts", 0) or 0
-            avg_power = activity.get("icu_average_watts", 0) or 0
 
-            max_normalized_power = max(max_normalized_power, normalized_power)
-            max_avg_power = max(max_avg_power, avg_power)
+throttle = AdaptiveThrottle(RATE_LIMIT, RATE_BURST, HTTP_POOL_SIZE, BACKGROUND_RATE_SHARE)
+# Set in background tasks whose requests must never delay a command's
+_background_fetch = contextvars.ContextVar("background_fetch", default=False)
 
-            if weight > 0:
-                max_normalized_power_per_kg = max(max_normalized_power_per_kg, normalized_power / weight)
-                max_avg_power_per_kg = max(max_avg_power_per_kg, avg_power / weight)
 
-            max_pm_ftp = max(max_pm_ftp, activity.get("icu_pm_ftp", 0) or 0)
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# =========================
+# intervals.icu API Client
+# =========================
+# One pooled keep-alive session is shared by every fetch so TLS connections are
+# reused and requests never block the event loop.
+
+_http_session = None
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_SIZE,
+            keepalive_timeout=HTTP_KEEPALIVE,
+            ttl_dns_cache=300,
+        )
+        _http_session = aiohttp.ClientSession(
+            connector=connector,
+            auth=aiohttp.BasicAuth("API_KEY", API_KEY),
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+    return _http_session
+
+
+async def close_http_session():
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
+async def api_get(path: str, params: dict = None, parse=None) -> tuple:
+    """GET an intervals.icu API path. Returns (status, parsed JSON or error text).
+
+    Client errors such as 404 are returned to the caller; rate limits, server errors and
+    network failures are retried and raise IntervalsAPIError when they persist. ``parse``
+    replaces the JSON decoding of a 200 response: ``await parse(response)`` returns
+    (data, bytes read), so large bodies can be consumed as they stream in.
+    """
+    session = await get_http_session()
+    endpoint = api_endpoint(path)
+    background = _background_fetch.get()
+    for attempt in range(MAX_RETRIES + 1):
+        await throttle.acquire(background)
+        throttled = False
+        retry_after = None
+        status = "error"
+        started = time.perf_counter()
+        try:
+            async with session.get(f"{API_BASE_URL}{path}", params=params) as response:
+                status = str(response.status)
+                if response.status == 200 and parse is not None:
+                    data, size = await parse(response)
+                    metrics.inc("ted_icu_bytes_total", size, endpoint=endpoint)
+                    return response.status, data
+                body = await response.read()
+                metrics.inc("ted_icu_bytes_total", len(body), endpoint=endpoint)
+                if response.status == 200:
+                    return response.status, json.loads(body) if body.strip() else None
+                text = body.decode(response.get_encoding(), errors="replace")
+                if response.status not in RETRY_STATUSES:
+                    return response.status, text
+                throttled = response.status == 429
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                reason = f"HTTP {response.status} {text[:200]}".strip()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            reason = f"{type(e).__name__}: {e}"
+        finally:
+            metrics.observe("ted_icu_request_seconds", time.perf_counter() - started, endpoint=endpoint, status=status)
+            await throttle.release(throttled)
+
+        delay = retry_after
+        if delay is None:
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        if throttled:
+            throttle.pause(delay)
+        if attempt == MAX_RETRIES or delay > BACKOFF_MAX:
+            break
+        print(f"intervals.icu {path}: {reason}, retrying in {delay:.1f}s ({attempt + 1}/{MAX_RETRIES})")
+        metrics.inc("ted_icu_retries_total", endpoint=endpoint)
+        await asyncio.sleep(delay)
+
+    metrics.inc("ted_icu_failures_total", endpoint=endpoint)
+    raise IntervalsAPIError(path, reason)
+
+
+def api_endpoint(path: str) -> str:
+    """The path with athlete and activity ids replaced, for grouping request metrics."""
+    return re.sub(r"/(athlete|activity)/[^/]+", r"/\1/{id}", path)
+
+
+# =========================
+# Activity Records
+# =========================
+# An activity from intervals.icu carries dozens of fields; the reports read the ones in
+# ACTIVITY_FIELDS. The list endpoint is asked for only those, the response is decoded
+# one activity at a time as it streams in, and each activity is kept as a slotted
+# ActivityRecord instead of a dict, so memory stays flat however long the history is.
+
+ACTIVITY_FIELDS = (
+    "id", "start_date_local", "type", "distance", "moving_time", "total_elevation_gain",
+    "icu_training_load", "icu_weighted_avg_watts", "icu_average_watts", "icu_weight", "icu_ctl", "icu_atl",
+    "icu_pm_ftp", "icu_hr_zone_times", "max_heartrate", "athlete_max_hr", "analyzed", "updated",
+)
+
+
+class ActivityRecord:
+    """The ACTIVITY_FIELDS of one activity. Reads like the API's dict: ``act.get("type")``."""
+    __slots__ = ACTIVITY_FIELDS
+
+    def __init__(self, data: dict):
+        get = data.get
+        for field in ACTIVITY_FIELDS:
+            setattr(self, field, get(field))
+
+    def get(self, field: str, default=None):
+        value = getattr(self, field, None)
+        return default if value is None else value
+
+    def __getitem__(self, field: str):
+        if field not in ACTIVITY_FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in ACTIVITY_FIELDS if getattr(self, field) is not None}
+
+
+class JSONArrayStream:
+    """Decode the items of a top-level JSON array from byte chunks as they arrive."""
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._started = False
+        self._finished = False
+
+    def feed(self, chunk: bytes, final: bool = False) -> list:
+        """Add a chunk; returns the items completed by it. Raises ValueError on malformed input."""
+        buffer = self._buffer + self._text.decode(chunk, final)
+        pos, end_of_buffer = 0, len(buffer)
+        items = []
+        while not self._finished:
+            while pos < end_of_buffer and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == end_of_buffer:
+                break
+            if not self._started:
+                if buffer[pos] != "[":
+                    raise ValueError("expected a JSON array")
+                self._started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                self._finished = True
+                pos += 1
+                break
+            try:
+                item, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break  # The item continues in the next chunk
+            after = end
+            while after < end_of_buffer and buffer[after] in " \t\r\n":
+                after += 1
+            if after < end_of_buffer and buffer[after] not in ",]":
+                if final or buffer[end - 1] in '"]}':
+                    raise ValueError("expected ',' or ']' after an array item")
+                break  # A number cut off at "." or "e" decoded as a shorter one
+            if after == end_of_buffer and not final and buffer[end - 1] not in '"]}':
+                break  # A number or literal could still be cut off
+            items.append(item)
+            pos = end
+        self._buffer = buffer[pos:]
+        if final and not self._finished:
+            raise ValueError("JSON array is incomplete")
+        return items
+
+
+async def parse_activity_list(response) -> tuple:
+    """api_get parser for activity lists: ActivityRecords decoded as the body streams in."""
+    stream = JSONArrayStream()
+    records = []
+    size = 0
+    async for chunk in response.content.iter_chunked(64 * 1024):
+        size += len(chunk)
+        records.extend(ActivityRecord(item) for item in stream.feed(chunk))
+    records.extend(ActivityRecord(item) for item in stream.feed(b"", final=True))
+    return records, size
+
+
+async def fetch_for_roster(fetch, athlete_ids, on_result=None) -> dict:
+    """Run ``fetch(athlete_id)`` for every athlete at once, at most FETCH_CONCURRENCY in flight.
+
+    Results are returned keyed by athlete id in roster order, so a report takes about as
+    long as its slowest athlete instead of the sum of all of them. ``on_result(athlete_id,
+    result)`` is called as each athlete finishes, for reports that show partial results.
+    """
+    athlete_ids = list(athlete_ids)
+    semaphore = asyncio.Semaphore(max(1, FETCH_CONCURRENCY))
+
+    async def fetch_one(athlete_id):
+        async with semaphore:
+            result = await fetch(athlete_id)
+        if on_result is not None:
+            on_result(athlete_id, result)
+        return result
+
+    results = await asyncio.gather(*(fetch_one(athlete_id) for athlete_id in athlete_ids))
+    return dict(zip(athlete_ids, results))
+
+
+# =========================
+# Report Coalescing
+# =========================
+# Identical report requests that arrive while one is already being built wait for that
+# build instead of starting their own, and the finished result is reused for a short
+# while so a burst of the same command costs one round of API calls.
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}  # key -> asyncio.Future
+        self._results = {}  # key -> (expires_at, value)
+
+    async def run(self, key, compute, ttl: float, refresh: bool = False):
+        """Return the cached result for ``key`` or join/start a build of it.
+
+        With ``refresh`` a new build is always started (unless one is already running), while
+        other callers keep getting the previous result until it finishes.
+        """
+        now = time.monotonic()
+        cached = self._results.get(key)
+        if cached is not None and cached[0] > now and not refresh:
+            return cached[1]
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(compute())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done, ttl))
+        # Shielded so one caller giving up does not cancel the build for everyone else
+        return await asyncio.shield(future)
+
+    def _finish(self, key, future, ttl: float):
+        self._inflight.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        now = time.monotonic()
+        for stale in [k for k, (expires_at, _) in self._results.items() if expires_at <= now]:
+            del self._results[stale]
+        if ttl > 0:
+            self._results[key] = (now + ttl, future.result())
+
+    def is_cached(self, key) -> bool:
+        cached = self._results.get(key)
+        return cached is not None and cached[0] > time.monotonic()
+
+    def is_running(self, key) -> bool:
+        return key in self._inflight
+
+    def export(self) -> list:
+        """(key, value, seconds left) for every result that has not expired."""
+        now = time.monotonic()
+        return [(key, value, expires_at - now) for key, (expires_at, value) in self._results.items() if expires_at > now]
+
+    def restore(self, key, value, ttl: float):
+        """Serve ``value`` for ``key`` for ``ttl`` seconds, unless a result is already held."""
+        if not self.is_cached(key):
+            self._results[key] = (time.monotonic() + ttl, value)
+
+
+report_flights = SingleFlight()
+
+# While a report is built its key is set here, so publish_progress() reaches whoever
+# is waiting for that report, including callers that joined an existing build.
+_building_report = contextvars.ContextVar("building_report", default=None)
+_progress_listeners = {}  # report key -> set of callbacks
+
+
+def publish_progress(render):
+    """Offer a partial version of the report being built. ``await render()`` returns its text
+    and is only called by listeners that actually show it, so publishing is cheap."""
+    for listener in list(_progress_listeners.get(_building_report.get(), ())):
+        listener(render)
+
+
+def coalesced(func):
+    """Run ``func`` through ``report_flights``, keyed by its name and arguments.
+
+    ``func.refresh(*args)`` rebuilds the result and keeps it for REPORT_MAX_STALENESS;
+    ``func.is_cached(*args)`` tells whether a call would be answered without a build;
+    ``func.stream(on_progress, *args)`` also passes partial results to ``on_progress``.
+    """
+    async def build(*args):
+        _building_report.set((func.__name__, *args))
+        with metrics.timed("ted_report_build_seconds", report=func.__name__):
+            return await func(*args)
+
+    @functools.wraps(func)
+    async def wrapper(*args):
+        key = (func.__name__, *args)
+        if report_flights.is_cached(key):
+            metrics.inc("ted_report_requests_total", report=func.__name__, result="hit")
+        elif report_flights.is_running(key):
+            metrics.inc("ted_report_requests_total", report=func.__name__, result="joined")
+        else:
+            metrics.inc("ted_report_requests_total", report=func.__name__, result="miss")
+        return await report_flights.run(key, lambda: build(*args), REPORT_CACHE_TTL)
+
+    async def refresh(*args):
+        return await report_flights.run(
+            (func.__name__, *args), lambda: build(*args), REPORT_MAX_STALENESS, refresh=True
+        )
+
+    async def stream(on_progress, *args):
+        listeners = _progress_listeners.setdefault((func.__name__, *args), set())
+        listeners.add(on_progress)
+        try:
+            return await wrapper(*args)
+        finally:
+            listeners.discard(on_progress)
+            if not listeners:
+                _progress_listeners.pop((func.__name__, *args), None)
+
+    wrapper.refresh = refresh
+    wrapper.stream = stream
+    wrapper.is_cached = lambda *args: report_flights.is_cached((func.__name__, *args))
+    return wrapper
+
 
-        if activity.get("icu_hr_zone_times"):
-            for i, time_in_zone in enumerate(activity.get("icu_hr_zone_times", [])):
-                if i < len(hr_zone_times):
-                    hr_zone_times[i] += time_in_zone
+# =========================
+# Compute Pool
+# =========================
+# The pure CPU stages of a report (aggregating totals, scanning for highlights and
+# rendering the tables) run in a worker pool so a big roster does not hold up the event
+# loop, other commands or the gateway heartbeat. COMPUTE_POOL=process sidesteps the GIL
+# at the cost of pickling each stage's input; "inline" runs them on the loop.
+
+_compute_pool = None
+
+
+def get_compute_pool():
+    global _compute_pool
+    if _compute_pool is None and COMPUTE_POOL in ("thread", "process"):
+        if COMPUTE_POOL == "process":
+            _compute_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=COMPUTE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            _compute_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=COMPUTE_WORKERS, thread_name_prefix="ted-compute"
+            )
+    return _compute_pool
+
+
+def close_compute_pool():
+    global _compute_pool
+    if _compute_pool is not None:
+        _compute_pool.shutdown(wait=False, cancel_futures=True)
+    _compute_pool = None
+
+
+def _timed_call(func, args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+async def run_compute(func, *args):
+    """Run ``func(*args)`` in the compute pool and record how long it worked for.
+
+    In process mode ``func`` must be a module-level function and its arguments picklable.
+    """
+    pool = get_compute_pool()
+    if pool is None:
+        result, seconds = _timed_call(func, args)
+    else:
+        result, seconds = await asyncio.get_running_loop().run_in_executor(pool, _timed_call, func, args)
+    metrics.observe("ted_compute_seconds", seconds, stage=func.__name__, pool=COMPUTE_POOL)
+    return result
+
+
+# =========================
+# Local Activity Store
+# =========================
+# Activities are kept in SQLite keyed by (athlete, activity id). Each athlete has a
+# contiguous synced window [synced_from, synced_through]; only dates outside it, plus
+# the last SYNC_RECHECK_DAYS days, are ever requested from intervals.icu again.
+
+def shift_date(date_str: str, days: int) -> str:
+    return (datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+class ActivityStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._db_lock = threading.Lock()
+        self._sync_locks = {}
+        self._generations = {}  # athlete_id -> bumped whenever stored activities change
+        self._rollup_indexes = {}  # athlete_id -> (generation, RollupIndex)
+        self._fitness = {}  # athlete_id -> FitnessSeries
+        self._fitness_dirty = {}  # athlete_id -> earliest day changed since its series was brought up to date
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS activities (
+                    athlete_id TEXT NOT NULL,
+                    activity_id TEXT NOT NULL,
+                    start_date TEXT NOT NULL,
+                    start_time TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (athlete_id, activity_id)
+                );
+                CREATE INDEX IF NOT EXISTS activities_by_date ON activities (athlete_id, start_date);
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    athlete_id TEXT PRIMARY KEY,
+                    synced_from TEXT NOT NULL,
+                    synced_through TEXT NOT NULL,
+                    checked_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS activity_curves (
+                    activity_id TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    data TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS activity_streams (
+                    activity_id TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    data BLOB NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS rosters (
+                    guild_id INTEGER PRIMARY KEY
+                );
+                CREATE TABLE IF NOT EXISTS roster_members (
+                    guild_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    athlete_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    PRIMARY KEY (guild_id, athlete_id)
+                );
+            """)
+            rollup_columns = ", ".join(f"{column} REAL" for column in ROLLUP_COLUMNS)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS daily_rollups (athlete_id TEXT NOT NULL, day TEXT NOT NULL, "
+                f"{rollup_columns}, PRIMARY KEY (athlete_id, day))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS daily_load (athlete_id TEXT NOT NULL, day TEXT NOT NULL, "
+                "load REAL NOT NULL, ctl REAL, atl REAL, PRIMARY KEY (athlete_id, day))"
+            )
+            has_activities, needs_rollups, needs_load = self._conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM activities), NOT EXISTS (SELECT 1 FROM daily_rollups), "
+                "NOT EXISTS (SELECT 1 FROM daily_load)"
+            ).fetchone()
+            if has_activities and (needs_rollups or needs_load):
+                self._rebuild_daily_tables(needs_rollups, needs_load)
+        return self._conn
+
+    def _rebuild_daily_tables(self, rollups: bool, load: bool):
+        # Databases created before these tables existed: materialize them from stored activities once
+        athlete_ids = [row[0] for row in self._conn.execute("SELECT DISTINCT athlete_id FROM activities")]
+        with self._conn:
+            for athlete_id in athlete_ids:
+                activities = [
+                    json.loads(data) for (data,) in self._conn.execute(
+                        "SELECT data FROM activities WHERE athlete_id = ? ORDER BY start_time DESC, activity_id DESC",
+                        (athlete_id,),
+                    )
+                ]
+                if rollups:
+                    self._insert_rollups(athlete_id, daily_rollup_rows(activities))
+                if load:
+                    self._insert_load(athlete_id, daily_load_rows(activities))
+
+    def _insert_rollups(self, athlete_id: str, rollup_rows: list):
+        placeholders = ", ".join("?" * (len(ROLLUP_COLUMNS) + 2))
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO daily_rollups VALUES ({placeholders})",
+            [(athlete_id, *row) for row in rollup_rows],
+        )
+
+    def _insert_load(self, athlete_id: str, load_rows: list):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO daily_load VALUES (?, ?, ?, ?, ?)", [(athlete_id, *row) for row in load_rows]
+        )
+
+    def sync_lock(self, athlete_id: str) -> asyncio.Lock:
+        # One sync per athlete at a time, so concurrent commands share the same fetch
+        if athlete_id not in self._sync_locks:
+            self._sync_locks[athlete_id] = asyncio.Lock()
+        return self._sync_locks[athlete_id]
+
+    def sync_state(self, athlete_id: str):
+        with self._db_lock:
+            return self.conn.execute(
+                "SELECT synced_from, synced_through, checked_at FROM sync_state WHERE athlete_id = ?",
+                (athlete_id,),
+            ).fetchone()
+
+    def replace_range(self, athlete_id: str, oldest_date: str, newest_date: str, activities: list):
+        """Make the stored activities for [oldest_date, newest_date] match a fresh download."""
+        rows = [
+            (athlete_id, str(act["id"]), (act.get("start_date_local") or "")[:10],
+             act.get("start_date_local") or "", json.dumps(act.to_dict()))
+            for act in activities
+            if act.get("id") is not None
+        ]
+        rollup_rows = daily_rollup_rows(activities)
+        load_rows = daily_load_rows(activities)
+        with self._db_lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM activities WHERE athlete_id = ? AND start_date BETWEEN ? AND ?",
+                (athlete_id, oldest_date, newest_date),
+            )
+            self.conn.executemany("INSERT OR REPLACE INTO activities VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.execute(
+                "DELETE FROM daily_rollups WHERE athlete_id = ? AND day BETWEEN ? AND ?",
+                (athlete_id, oldest_date, newest_date),
+            )
+            self._insert_rollups(athlete_id, rollup_rows)
+            self.conn.execute(
+                "DELETE FROM daily_load WHERE athlete_id = ? AND day BETWEEN ? AND ?",
+                (athlete_id, oldest_date, newest_date),
+            )
+            self._insert_load(athlete_id, load_rows)
+            self._generations[athlete_id] = self._generations.get(athlete_id, 0) + 1
+            self._fitness_dirty[athlete_id] = min(oldest_date, self._fitness_dirty.get(athlete_id, oldest_date))
+
+    def mark_synced(self, athlete_id: str, synced_from: str, synced_through: str, checked_at: float):
+        with self._db_lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+                (athlete_id, synced_from, synced_through, checked_at),
+            )
+
+    def query(self, athlete_id: str, oldest_date: str, newest_date: str) -> list:
+        # Newest first, the same order intervals.icu lists them in
+        with self._db_lock:
+            rows = self.conn.execute(
+                "SELECT data FROM activities WHERE athlete_id = ? AND start_date BETWEEN ? AND ? "
+                "ORDER BY start_time DESC, activity_id DESC",
+                (athlete_id, oldest_date, newest_date),
+            ).fetchall()
+        return [ActivityRecord(json.loads(data)) for (data,) in rows]
+
+    def rollup_index(self, athlete_id: str) -> "RollupIndex":
+        """The athlete's daily rollups ready for window queries, rebuilt only after new data."""
+        with self._db_lock:
+            generation = self._generations.get(athlete_id, 0)
+            cached = self._rollup_indexes.get(athlete_id)
+            if cached is not None and cached[0] == generation:
+                return cached[1]
+            rows = self.conn.execute(
+                f"SELECT day, {', '.join(ROLLUP_COLUMNS)} FROM daily_rollups WHERE athlete_id = ? ORDER BY day",
+                (athlete_id,),
+            ).fetchall()
+        index = RollupIndex(rows)
+        self._rollup_indexes[athlete_id] = (generation, index)
+        return index
+
+    def fitness_window(self, athlete_id: str, oldest_date: str, newest_date: str) -> tuple:
+        """Daily (CTL, ATL) arrays for [oldest_date, newest_date]. The athlete's FitnessSeries is
+        kept between calls and only the days changed since the last call are recomputed."""
+        with self._db_lock:
+            series = self._fitness.get(athlete_id)
+            dirty_from = self._fitness_dirty.pop(athlete_id, None)
+            if series is None or not series.load or (dirty_from and date_ordinal(dirty_from) <= series.first_day):
+                series = FitnessSeries.from_rows(self.conn.execute(
+                    "SELECT day, load, ctl, atl FROM daily_load WHERE athlete_id = ? ORDER BY day",
+                    (athlete_id,),
+                ).fetchall())
+                self._fitness[athlete_id] = series
+            elif dirty_from:
+                series.update(date_ordinal(dirty_from), self.conn.execute(
+                    "SELECT day, load, ctl, atl FROM daily_load WHERE athlete_id = ? AND day >= ? ORDER BY day",
+                    (athlete_id, dirty_from),
+                ).fetchall())
+            return series.window(date_ordinal(oldest_date), date_ordinal(newest_date))
+
+    def _load_versioned(self, table: str, activity_ids: list) -> dict:
+        found = {}
+        with self._db_lock:
+            for start in range(0, len(activity_ids), 500):
+                chunk = activity_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for activity_id, version, data in self.conn.execute(
+                    f"SELECT activity_id, version, data FROM {table} WHERE activity_id IN ({placeholders})",
+                    chunk,
+                ):
+                    found[activity_id] = (version, data)
+        return found
+
+    def load_curves(self, activity_ids: list) -> dict:
+        """Stored curves as {activity_id: (version, curve data)}."""
+        return self._load_versioned("activity_curves", activity_ids)
+
+    def save_curve(self, activity_id: str, version: str, data: bytes):
+        with self._db_lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO activity_curves VALUES (?, ?, ?)", (activity_id, version, data)
+            )
+
+    def load_streams(self, activity_ids: list) -> dict:
+        """Stored power streams as {activity_id: (version, pack_watts() blob)}."""
+        return self._load_versioned("activity_streams", activity_ids)
+
+    def save_stream(self, activity_id: str, version: str, data: bytes):
+        with self._db_lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO activity_streams VALUES (?, ?, ?)", (activity_id, version, data)
+            )
+
+    def load_rosters(self) -> dict:
+        """guild_id -> [(athlete_id, name), ...] in roster order, for every guild with its own roster."""
+        with self._db_lock:
+            rosters = {guild_id: [] for (guild_id,) in self.conn.execute("SELECT guild_id FROM rosters")}
+            for guild_id, athlete_id, name in self.conn.execute(
+                "SELECT guild_id, athlete_id, name FROM roster_members ORDER BY guild_id, position"
+            ):
+                rosters.setdefault(guild_id, []).append((athlete_id, name))
+        return rosters
+
+    def save_roster(self, guild_id: int, roster: tuple):
+        with self._db_lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO rosters VALUES (?)", (guild_id,))
+            self.conn.execute("DELETE FROM roster_members WHERE guild_id = ?", (guild_id,))
+            self.conn.executemany(
+                "INSERT INTO roster_members VALUES (?, ?, ?, ?)",
+                [(guild_id, position, athlete_id, name) for position, (athlete_id, name) in enumerate(roster)],
+            )
+
+
+activity_store = ActivityStore(ACTIVITY_DB_PATH)
 
-    total_hr_time = sum(hr_zone_times)
-    hr_zone_percentages = [
-        (time / total_hr_time) * 100 if total_hr_time > 0 else 0 for time in hr_zone_times
+
+# =========================
+# Rosters
+# =========================
+# Every Discord server (guild) can keep its own roster, changed at runtime with !roster
+# and saved in the activity store. Servers without one, and DMs, use the default roster
+# from the ATHLETE_ID_n variables. A roster is a tuple of (athlete_id, name) pairs, so it
+# is part of each report's cache key and servers with the same roster share reports.
+# Everything below the reports (syncs, snapshots, curves) is keyed by athlete id alone,
+# so an athlete on several rosters is fetched once for all of them.
+
+ATHLETE_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,32}")
+MAX_ATHLETE_NAME = 32
+
+
+class RosterRegistry:
+    def __init__(self, store: ActivityStore, default: dict):
+        self.store = store
+        self.default = default  # athlete_id -> name, read on every use
+        self._rosters = None  # guild_id -> roster, only for guilds with their own
+        self._lock = asyncio.Lock()
+
+    def _guild_rosters(self) -> dict:
+        if self._rosters is None:
+            self._rosters = {guild_id: tuple(members) for guild_id, members in self.store.load_rosters().items()}
+        return self._rosters
+
+    def has_own(self, guild_id) -> bool:
+        return guild_id in self._guild_rosters()
+
+    def for_guild(self, guild_id) -> tuple:
+        roster = self._guild_rosters().get(guild_id)
+        return roster if roster is not None else tuple(self.default.items())
+
+    def rosters(self) -> list:
+        """Every distinct roster with athletes on it, the default one first."""
+        in_use = [tuple(self.default.items()), *self._guild_rosters().values()]
+        return [roster for roster in dict.fromkeys(in_use) if roster]
+
+    def athlete_ids(self) -> set:
+        return {athlete_id for roster in self.rosters() for athlete_id, _ in roster}
+
+    async def add(self, guild_id: int, athlete_id: str, name: str) -> tuple:
+        """Add an athlete to the guild's roster (or rename them). A guild's first change
+        starts from a copy of the default roster."""
+        async with self._lock:
+            members = dict(self.for_guild(guild_id))
+            members[athlete_id] = name
+            return await self._save(guild_id, members)
+
+    async def remove(self, guild_id: int, athlete_id: str) -> tuple:
+        async with self._lock:
+            members = dict(self.for_guild(guild_id))
+            members.pop(athlete_id, None)
+            return await self._save(guild_id, members)
+
+    async def _save(self, guild_id: int, members: dict) -> tuple:
+        roster = tuple(members.items())
+        await asyncio.to_thread(self.store.save_roster, guild_id, roster)
+        self._guild_rosters()[guild_id] = roster
+        return roster
+
+
+rosters = RosterRegistry(activity_store, ATHLETE_IDS)
+
+
+# =========================
+# Power Curves
+# =========================
+# intervals.icu sends a curve as parallel "secs" and "values" lists. They are kept as
+# two small NumPy arrays sorted by duration (int32 seconds, float32 watts), and curves
+# with identical duration grids share one read-only secs array, so thousands of
+# per-activity curves fit in a few megabytes and serialise to a compact blob.
+
+MAX_SHARED_GRIDS = 1024
+_shared_grids = {}  # secs array bytes -> the shared read-only array
+
+
+def _shared_grid(secs: np.ndarray) -> np.ndarray:
+    key = secs.tobytes()
+    grid = _shared_grids.get(key)
+    if grid is None:
+        if len(_shared_grids) >= MAX_SHARED_GRIDS:
+            return secs
+        grid = secs.copy()
+        grid.flags.writeable = False
+        grid = _shared_grids.setdefault(key, grid)
+    return grid
+
+
+class PowerCurve:
+    """Best average power by duration, with binary-search lookups of one or many durations.
+
+    Durations the curve has no point for read as 0.
+    """
+    __slots__ = ("secs", "watts", "weight")
+    _header = struct.Struct("<If")  # point count, weight
+
+    def __init__(self, secs=(), watts=(), weight: float = 0.0):
+        secs = np.asarray(secs, dtype=np.int32)
+        watts = np.asarray(watts, dtype=np.float32)
+        count = min(len(secs), len(watts))
+        secs, watts = secs[:count], watts[:count]
+        if count and not (secs[0] > 0 and np.all(secs[1:] > secs[:-1])):
+            keep = secs > 0
+            order = np.argsort(secs[keep], kind="stable")
+            secs, watts = secs[keep][order], watts[keep][order]
+            if len(secs):
+                # Repeated durations keep their best value
+                starts = np.flatnonzero(np.r_[True, secs[1:] != secs[:-1]])
+                secs, watts = secs[starts], np.maximum.reduceat(watts, starts)
+        self.secs = _shared_grid(secs)
+        self.watts = watts.copy()
+        self.weight = float(weight or 0)
+
+    @classmethod
+    def from_api(cls, data: dict) -> "PowerCurve":
+        """Build from an intervals.icu curve object ({} gives an empty curve)."""
+        if not data:
+            return cls()
+        values = [value or 0 for value in data.get("values") or ()]
+        return cls(data.get("secs") or (), values, data.get("weight"))
+
+    def __len__(self) -> int:
+        return len(self.secs)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the curve, counting the secs array as if unshared."""
+        return self.secs.nbytes + self.watts.nbytes + 250
+
+    def many(self, durations) -> np.ndarray:
+        """Power for each duration in seconds, as a float64 array."""
+        durations = np.asarray(durations, dtype=np.float64)
+        if not len(self.secs):
+            return np.zeros(len(durations))
+        index = np.minimum(np.searchsorted(self.secs, durations), len(self.secs) - 1)
+        exact = self.secs[index] == durations
+        return np.where(exact, self.watts[index], 0.0).astype(np.float64)
+
+    def to_bytes(self) -> bytes:
+        return self._header.pack(len(self.secs), self.weight) + self.secs.tobytes() + self.watts.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PowerCurve":
+        count, weight = cls._header.unpack_from(data)
+        curve = cls.__new__(cls)
+        curve.secs = _shared_grid(np.frombuffer(data, np.int32, count, cls._header.size))
+        curve.watts = np.frombuffer(data, np.float32, count, cls._header.size + 4 * count).copy()
+        curve.weight = weight
+        return curve
+
+
+# =========================
+# Mean-Maximal Power
+# =========================
+# Per-ride curves are computed locally from the ride's 1 Hz power stream, which is
+# downloaded once and kept zlib-compressed as uint16 watts. The best average over every
+# window of d seconds is the largest difference of the stream's cumulative sum d samples
+# apart, so each duration is one vectorised pass. Rides are reduced to MMP_DURATIONS
+# (every second up to 2 minutes, then progressively coarser); other durations are
+# computed from the stored streams when asked for.
+
+MMP_DURATIONS = np.concatenate([
+    np.arange(1, 121), np.arange(125, 601, 5), np.arange(630, 3601, 30), np.arange(3660, 24 * 3600 + 1, 60),
+]).astype(np.int32)
+
+
+def pack_watts(watts: np.ndarray) -> bytes:
+    return zlib.compress(np.clip(np.rint(watts), 0, 65535).astype("<u2").tobytes())
+
+
+def unpack_watts(data: bytes) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(data), dtype="<u2").astype(np.float64)
+
+
+def mean_max_power(watts: np.ndarray, durations) -> np.ndarray:
+    """Best average power over any window of each duration in seconds (0 if the ride is shorter)."""
+    totals = np.concatenate(([0.0], np.cumsum(watts, dtype=np.float64)))
+    best = np.zeros(len(durations))
+    for i, duration in enumerate(durations):
+        duration = int(duration)
+        if 0 < duration <= len(watts):
+            best[i] = np.max(totals[duration:] - totals[:-duration]) / duration
+    return best
+
+
+def mean_max_curve(watts: np.ndarray) -> PowerCurve:
+    durations = MMP_DURATIONS[:np.searchsorted(MMP_DURATIONS, len(watts), side="right")]
+    return PowerCurve(durations, mean_max_power(watts, durations))
+
+
+def parse_duration(text: str):
+    """Seconds from "90s", "90", "5m", "5min", "1h" or "1m30s"; None if it is not a duration."""
+    parts = re.findall(r"(\d+)\s*(hrs|hr|h|mins|min|m|secs|sec|s)?", text.strip().lower())
+    if not parts or "".join(n + u for n, u in parts) != re.sub(r"\s+", "", text.strip().lower()):
+        return None
+    scale = {"h": 3600, "hr": 3600, "hrs": 3600, "m": 60, "min": 60, "mins": 60}
+    seconds = sum(int(n) * scale.get(unit, 1) for n, unit in parts)
+    return seconds if 0 < seconds <= MMP_DURATIONS[-1] else None
+
+
+def duration_label(seconds: int) -> str:
+    """Column label in the style of the fixed bests columns ("15 sec", "20 min")."""
+    if seconds % 60 == 0:
+        return f"{seconds // 60} min"
+    return f"{seconds} sec"
+
+
+# =========================
+# Activity Power Curve Cache
+# =========================
+# A finished activity's power curve only changes when the activity is edited, so curves
+# are cached under (activity id, edit timestamp): an in-memory LRU with a byte budget in
+# front of the activity_curves table on disk.
+
+def activity_version(activity: dict) -> str:
+    """The activity's last-edit marker; a change invalidates its cached curve."""
+    return str(activity.get("analyzed") or activity.get("updated") or "")
+
+
+class PowerCurveCache:
+    def __init__(self, store: ActivityStore, max_bytes: int):
+        self.store = store
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # activity_id -> (version, curve, size)
+        self._bytes = 0
+        self._lock = threading.Lock()  # get_many and put run in worker threads
+
+    def _remember(self, activity_id: str, version: str, curve: PowerCurve, size: int):
+        with self._lock:
+            old = self._entries.pop(activity_id, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[activity_id] = (version, curve, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get_many(self, keys: list) -> dict:
+        """Look up (activity_id, version) keys; returns the hits as {key: curve}."""
+        hits = {}
+        on_disk = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key[0])
+                if entry is not None and entry[0] == key[1]:
+                    self._entries.move_to_end(key[0])
+                    hits[key] = entry[1]
+                else:
+                    on_disk.append(key)
+
+        metrics.inc("ted_curve_cache_total", len(keys) - len(on_disk), result="memory")
+        if on_disk:
+            stored = self.store.load_curves([activity_id for activity_id, _ in on_disk])
+            for activity_id, version in on_disk:
+                row = stored.get(activity_id)
+                # JSON rows are curves from the power-curve endpoint stored by older versions.
+                # They only cover that endpoint's durations, so they are recomputed from streams.
+                if row is not None and row[0] == version and not isinstance(row[1], str):
+                    curve = PowerCurve.from_bytes(row[1])
+                    self._remember(activity_id, version, curve, curve.nbytes)
+                    hits[(activity_id, version)] = curve
+            metrics.inc("ted_curve_cache_total", len(hits) - (len(keys) - len(on_disk)), result="disk")
+            metrics.inc("ted_curve_cache_total", len(keys) - len(hits), result="miss")
+        return hits
+
+    def put(self, activity_id: str, version: str, curve: PowerCurve):
+        self.store.save_curve(activity_id, version, curve.to_bytes())
+        self._remember(activity_id, version, curve, curve.nbytes)
+
+
+power_curve_cache = PowerCurveCache(activity_store, CURVE_CACHE_BYTES)
+_curve_warmups = set()  # (activity_id, version) keys being fetched in the background
+_curve_warmup_slots = asyncio.Semaphore(max(1, CURVE_WARMUP_CONCURRENCY))  # Shared by every warm-up
+_background_tasks = set()
+
+
+def spawn_background(coro) -> asyncio.Task:
+    task = asyncio.get_running_loop().create_task(coro)
+    # Hold a reference until done so the task is not garbage collected mid-flight
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+# =========================
+# Data Fetching and Processing Functions
+# =========================
+
+async def fetch_activities(athlete_id: str, oldest_date: str, newest_date: str):
+    """Download activities as ActivityRecords. Returns None if the request failed."""
+    params = {"oldest": oldest_date, "newest": newest_date, "fields": ",".join(ACTIVITY_FIELDS)}
+    status, data = await api_get(f"/athlete/{athlete_id}/activities", params, parse=parse_activity_list)
+    if status == 200:
+        return data
+    print(f"Error fetching activities for athlete {athlete_id}: {status} - {data}")
+    return None
+
+async def sync_activities(athlete_id: str, oldest_date: str, newest_date: str):
+    """Bring the local store up to date for the window, fetching only what it is missing."""
+    async with activity_store.sync_lock(athlete_id):
+        today = datetime.now().strftime("%Y-%m-%d")
+        state = await asyncio.to_thread(activity_store.sync_state, athlete_id)
+
+        ranges = []
+        if state is None:
+            synced_from, synced_through, checked_at = oldest_date, min(newest_date, today), time.time()
+            ranges.append((oldest_date, newest_date))
+        else:
+            synced_from, synced_through, checked_at = state
+            if oldest_date < synced_from:
+                ranges.append((oldest_date, shift_date(synced_from, -1)))
+                synced_from = oldest_date
+            recheck_from = max(synced_from, shift_date(synced_through, -SYNC_RECHECK_DAYS))
+            recently_checked = time.time() - checked_at < SYNC_MIN_INTERVAL
+            if newest_date > synced_through or (newest_date >= recheck_from and not recently_checked):
+                ranges.append((recheck_from, max(newest_date, synced_through)))
+                synced_through = max(synced_through, min(newest_date, today))
+                checked_at = time.time()
+
+        metrics.inc("ted_activity_sync_total", result="fetch" if ranges else "hit")
+        if not ranges:
+            return
+
+        fetched = await asyncio.gather(*(fetch_activities(athlete_id, a, b) for a, b in ranges))
+        if any(activities is None for activities in fetched):
+            # Keep the old watermark so the failed range is retried next time
+            return
+        for (a, b), activities in zip(ranges, fetched):
+            await asyncio.to_thread(activity_store.replace_range, athlete_id, a, b, activities)
+        await asyncio.to_thread(activity_store.mark_synced, athlete_id, synced_from, synced_through, checked_at)
+
+async def get_activities(athlete_id: str, oldest_date: str, newest_date: str) -> list:
+    await sync_activities(athlete_id, oldest_date, newest_date)
+    return await asyncio.to_thread(activity_store.query, athlete_id, oldest_date, newest_date)
+
+async def fetch_power_stream(activity_id: str):
+    """The activity's power samples as a float array (empty without a power meter), None on error."""
+    status, data = await api_get(f"/activity/{activity_id}/streams", {"types": "watts"})
+    if status != 200:
+        print(f"Error fetching power stream for activity {activity_id}: {status} - {data}")
+        return None
+    for stream in data or []:
+        if stream.get("type") == "watts":
+            return np.array([value or 0 for value in stream.get("data") or ()], dtype=np.float64)
+    return np.zeros(0)
+
+async def get_activity_power_curve(activity_id: str, version: str = "") -> PowerCurve:
+    """The ride's mean-max curve, computed from its power stream the first time it is needed."""
+    key = (str(activity_id), version)
+    cached = await asyncio.to_thread(power_curve_cache.get_many, [key])
+    if key in cached:
+        return cached[key]
+
+    watts = await fetch_power_stream(key[0])
+    if watts is None:
+        return PowerCurve()
+    curve = await asyncio.to_thread(mean_max_curve, watts)
+    await asyncio.to_thread(activity_store.save_stream, key[0], version, pack_watts(watts))
+    await asyncio.to_thread(power_curve_cache.put, key[0], version, curve)
+    return curve
+
+def stream_mean_max(keys: list, durations: list) -> np.ndarray:
+    """Best power for each duration over the stored streams of the given rides."""
+    best = np.zeros(len(durations))
+    stored = activity_store.load_streams([activity_id for activity_id, _ in keys])
+    for activity_id, version in keys:
+        row = stored.get(activity_id)
+        if row is not None and row[0] == version:
+            best = np.maximum(best, mean_max_power(unpack_watts(row[1]), durations))
+    return best
+
+async def fetch_stream_bests(athlete_id: str, durations: tuple) -> dict:
+    """All-time best power for any durations, from the athlete's ride streams since BESTS_HISTORY_START.
+
+    Only rides whose curve is already cached count. The others are fetched into the cache in
+    the background and counted under "missing", so a first request answers straight away
+    instead of downloading every stream while the command waits.
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    rides = [
+        act for act in await get_activities(athlete_id, BESTS_HISTORY_START, today)
+        if act.get("type") in CYCLING_TYPES and act.get("id")
     ]
+    keys = [(str(act["id"]), activity_version(act)) for act in rides]
+    cached = await asyncio.to_thread(power_curve_cache.get_many, keys)
+    missing = [key for key in keys if key not in cached]
+    warm_activity_power_curves(missing)
+
+    best = np.zeros(len(durations))
+    for curve in cached.values():
+        best = np.maximum(best, curve.many(durations))
+    off_grid = [i for i, duration in enumerate(durations) if duration not in MMP_DURATIONS]
+    if off_grid and cached:
+        exact = await asyncio.to_thread(stream_mean_max, list(cached), [durations[i] for i in off_grid])
+        best[off_grid] = exact
+
+    # Rides come newest first, so this is the current weight
+    weight = next((act.get("icu_weight") for act in rides if act.get("icu_weight")), 0)
+    return {
+        "best_efforts": {duration_label(d): value for d, value in zip(durations, best.tolist())},
+        "weight": weight,
+        "missing": len(missing),
+    }
 
+def warm_activity_power_curves(keys: list):
+    """Fetch missing per-activity curves into the cache in the background, as low-priority
+    requests. At most CURVE_WARMUP_LIMIT are queued at a time; the rest are left for later
+    calls, so a long history is filled in over several passes."""
+    keys = [key for key in keys if key not in _curve_warmups]
+    keys = keys[:max(0, CURVE_WARMUP_LIMIT - len(_curve_warmups))]
+    if not keys:
+        return
+    _curve_warmups.update(keys)
+
+    async def warm_one(key):
+        async with _curve_warmup_slots:
+            await get_activity_power_curve(*key)
+
+    async def warm():
+        _background_fetch.set(True)
+        try:
+            await asyncio.gather(*(warm_one(key) for key in keys), return_exceptions=True)
+        finally:
+            _curve_warmups.difference_update(keys)
+
+    spawn_background(warm())
+
+async def fetch_highlight_inputs(athlete_id: str, oldest_date: str, newest_date: str, missing_curves: list) -> tuple:
+    """Included activities in the window plus (weight, power curve) pairs to take best efforts from.
+
+    When every ride's curve is already cached the pairs are per ride and no request is made.
+    Otherwise one athlete-level request for the whole date range answers now, and the keys
+    of the missing per-ride curves are added to ``missing_curves``. The caller warms them
+    once the whole roster is fetched, so they never hold up another athlete's requests.
+    """
+    if oldest_date < snapshot_horizon():
+        # Older than any snapshot holds, so read the window from the store instead
+        activities = [
+            act for act in await get_activities(athlete_id, oldest_date, newest_date)
+            if act.get("type") in INCLUDED_TYPES
+        ]
+    else:
+        snapshot = await athlete_snapshots.get(athlete_id)
+        activities = snapshot.activities_between(oldest_date, newest_date)
+    rides = [act for act in activities if act.get("type") in CYCLING_TYPES and act.get("id")]
+    if not rides:
+        return activities, []
+
+    keys = [(str(act["id"]), activity_version(act)) for act in rides]
+    cached = await asyncio.to_thread(power_curve_cache.get_many, keys)
+    missing = [key for key in keys if key not in cached]
+    if not missing:
+        return activities, [((act.get("icu_weight", 0) or 0), cached[key]) for act, key in zip(rides, keys)]
+
+    missing_curves.extend(missing)
+    power_curve = await fetch_athlete_power_curve(athlete_id, f"r.{oldest_date}.{newest_date}")
+    if not power_curve:
+        return activities, []
+    # The range curve is the best over all rides, so use the weight it reports
+    weight = power_curve.weight or next(
+        (act.get("icu_weight") for act in rides if act.get("icu_weight")), 0
+    )
+    return activities, [(weight, power_curve)]
+
+# =========================
+# Columnar Activity Aggregation
+# =========================
+# Activities are loaded once into NumPy columns (one row per activity, tagged with the
+# athlete's roster index) and every summary, YTD and highlight metric is a masked
+# vector reduction over those columns.
+
+TYPE_CODES = {"Ride": 1, "VirtualRide": 2, "Run": 3}  # Anything else is 0
+CYCLING_CODES = [TYPE_CODES[t] for t in CYCLING_TYPES]
+INCLUDED_CODES = [TYPE_CODES[t] for t in INCLUDED_TYPES]
+HR_ZONES = 5
+
+
+class ActivityTable:
+    __slots__ = (
+        "athletes", "athlete", "type_code", "included", "cycling", "distance", "moving_time",
+        "training_load", "weighted_watts", "average_watts", "weight", "ctl", "pm_ftp",
+        "hr_zone_times", "max_heartrate", "athlete_max_hr", "elevation_gain",
+    )
+
+    def __init__(self, roster_activities: list):
+        """``roster_activities`` holds one list of activity dicts per athlete, in roster order."""
+        activities = [act for athlete_activities in roster_activities for act in athlete_activities]
+        count = len(activities)
+
+        def column(field):
+            return np.fromiter(((act.get(field) or 0) for act in activities), dtype=np.float64, count=count)
+
+        self.athletes = len(roster_activities)
+        self.athlete = np.repeat(
+            np.arange(self.athletes), np.array([len(acts) for acts in roster_activities], dtype=np.intp)
+        )
+        self.type_code = np.fromiter(
+            (TYPE_CODES.get(act.get("type"), 0) for act in activities), dtype=np.int8, count=count
+        )
+        self.included = np.isin(self.type_code, INCLUDED_CODES)
+        self.cycling = np.isin(self.type_code, CYCLING_CODES)
+        self.distance = column("distance")
+        self.moving_time = column("moving_time")
+        self.training_load = column("icu_training_load")
+        self.weighted_watts = column("icu_weighted_avg_watts")
+        self.average_watts = column("icu_average_watts")
+        self.weight = column("icu_weight")
+        self.pm_ftp = column("icu_pm_ftp")
+        self.max_heartrate = column("max_heartrate")
+        self.athlete_max_hr = column("athlete_max_hr")
+        self.elevation_gain = column("total_elevation_gain")
+        self.ctl = np.fromiter(
+            (np.nan if act.get("icu_ctl") is None else act["icu_ctl"] for act in activities),
+            dtype=np.float64, count=count,
+        )
+        self.hr_zone_times = np.zeros((count, HR_ZONES))
+        for row, act in enumerate(activities):
+            zones = (act.get("icu_hr_zone_times") or [])[:HR_ZONES]
+            if zones:
+                self.hr_zone_times[row, :len(zones)] = zones
+
+    def _sum(self, values, mask):
+        return np.bincount(self.athlete[mask], weights=values[mask], minlength=self.athletes)
+
+    def _max(self, values, mask):
+        out = np.zeros(self.athletes)
+        np.maximum.at(out, self.athlete[mask], values[mask])
+        return out
+
+    def _per_kg(self, values):
+        return np.divide(values, self.weight, out=np.zeros_like(values), where=self.weight > 0)
+
+    def totals(self) -> dict:
+        """Raw per-group totals and maxima, one array entry per group (athlete or day)."""
+        included, cycling = self.included, self.cycling
+        hr_zone_times = np.zeros((self.athletes, HR_ZONES))
+        np.add.at(hr_zone_times, self.athlete[included], self.hr_zone_times[included])
+
+        # First and last CTL in list order, per group
+        ctl_rows = np.flatnonzero(included & ~np.isnan(self.ctl))
+        ctl_start = np.full(self.athletes, np.nan)
+        ctl_end = np.full(self.athletes, np.nan)
+        groups, first = np.unique(self.athlete[ctl_rows], return_index=True)
+        ctl_start[groups] = self.ctl[ctl_rows[first]]
+        groups, last = np.unique(self.athlete[ctl_rows][::-1], return_index=True)
+        ctl_end[groups] = self.ctl[ctl_rows[::-1][last]]
+
+        return {
+            "distance": self._sum(self.distance, included),
+            "moving_time": self._sum(self.moving_time, included),
+            "training_load": self._sum(self.training_load, included),
+            "max_normalized_power": self._max(self.weighted_watts, cycling),
+            "max_avg_power": self._max(self.average_watts, cycling),
+            "max_normalized_power_per_kg": self._max(self._per_kg(self.weighted_watts), cycling),
+            "max_avg_power_per_kg": self._max(self._per_kg(self.average_watts), cycling),
+            "max_pm_ftp": self._max(self.pm_ftp, cycling),
+            "hr_zone_times": hr_zone_times,
+            "ctl_start": ctl_start,
+            "ctl_end": ctl_end,
+        }
+
+    def best_single(self, values):
+        """Row of the first included activity with the largest value, or None if none is above 0.
+
+        Rows are in roster order, so ties go to the athlete listed first.
+        """
+        masked = np.where(self.included, values, 0.0)
+        if masked.size == 0:
+            return None
+        row = int(np.argmax(masked))
+        return row if masked[row] > 0 else None
+
+    def max_hr_percent(self):
+        valid = (self.athlete_max_hr > 0) & (self.max_heartrate > 0)
+        return np.divide(
+            self.max_heartrate * 100.0, self.athlete_max_hr, out=np.zeros_like(self.max_heartrate), where=valid
+        )
+
+
+def summarize_totals(totals: dict, weeksago: int) -> dict:
+    """Turn one group's raw totals into the metrics the summary tables show."""
+    hr_zone_times = np.asarray(totals["hr_zone_times"], dtype=np.float64)
+    total_hr_time = hr_zone_times.sum()
+    hr_zone_percentages = hr_zone_times * 100 / total_hr_time if total_hr_time > 0 else np.zeros(HR_ZONES)
+
+    ctl_start, ctl_end = totals["ctl_start"], totals["ctl_end"]
     fitness_gain_percentage = 0.0
-    if ctl_start and ctl_start > 0:
+    if ctl_start > 0:
         fitness_gain_percentage = (((ctl_end - ctl_start) / ctl_start) * 100) * -1
 
+    total_training_load = float(totals["training_load"])
     return {
-        "total_distance": total_distance / 1000,
-        "total_duration": total_duration / 3600,
+        "total_distance": float(totals["distance"]) / 1000,
+        "total_duration": float(totals["moving_time"]) / 3600,
+        "total_training_load": total_training_load,
         "avg_training_load_per_week": total_training_load / weeksago if weeksago > 0 else 0,
-        "max_normalized_power": max_normalized_power,
-        "max_avg_power": max_avg_power,
-        "max_normalized_power_per_kg": max_normalized_power_per_kg,
-        "max_avg_power_per_kg": max_avg_power_per_kg,
-        "max_pm_ftp": max_pm_ftp,
-        "hr_zone_percentages": hr_zone_percentages,
-        "fitness_gain_percentage": fitness_gain_percentage
+        "max_normalized_power": float(totals["max_normalized_power"]),
+        "max_avg_power": float(totals["max_avg_power"]),
+        "max_normalized_power_per_kg": float(totals["max_normalized_power_per_kg"]),
+        "max_avg_power_per_kg": float(totals["max_avg_power_per_kg"]),
+        "max_pm_ftp": float(totals["max_pm_ftp"]),
+        "hr_zone_percentages": hr_zone_percentages.tolist(),
+        "fitness_gain_percentage": float(fitness_gain_percentage)
     }
 
-def fetch_power_curves(athlete_id: str) -> dict:
-    url = f"{API_BASE_URL}/athlete/{athlete_id}/power-curves"
-    params = {"curves": "all", "type": "Ride"}
-    auth = HTTPBasicAuth('API_KEY', API_KEY)
-    response = requests.get(url, auth=auth, params=params)
 
-    if response.status_code == 200:
-        power_data = response.json().get("list", [])
-        if not power_data:
-            return {"best_efforts": {}, "weight": 0}
+def summarize_roster(named_totals: dict, weeksago: int) -> dict:
+    """summarize_totals for every athlete in {athlete name: totals}."""
+    return {name: summarize_totals(totals, weeksago) for name, totals in named_totals.items()}
+
+
+# =========================
+# Daily Rollups
+# =========================
+# Each athlete's activities are also materialized as one row of totals per day, refreshed
+# whenever the store replaces a date range. Window queries then use prefix sums for the
+# additive columns and a sparse table for the maxima, so any `!summary N` costs the same.
+
+ROLLUP_SUM_FIELDS = ("distance", "moving_time", "training_load")
+ROLLUP_MAX_FIELDS = (
+    "max_normalized_power", "max_avg_power", "max_normalized_power_per_kg", "max_avg_power_per_kg", "max_pm_ftp",
+)
+ROLLUP_COLUMNS = (
+    ROLLUP_SUM_FIELDS
+    + tuple(f"hr_zone_{zone + 1}" for zone in range(HR_ZONES))
+    + ROLLUP_MAX_FIELDS
+    + ("ctl_start", "ctl_end")
+)
+
+
+def date_ordinal(date_str: str) -> int:
+    return date.fromisoformat(date_str[:10]).toordinal()
+
+
+def daily_rollup_rows(activities: list) -> list:
+    """One (day, *ROLLUP_COLUMNS) row per day that has activities."""
+    by_day = {}
+    for act in activities:
+        day = (act.get("start_date_local") or "")[:10]
+        if day:
+            by_day.setdefault(day, []).append(act)
+    days = sorted(by_day)
+    totals = ActivityTable([by_day[day] for day in days]).totals()
+
+    columns = (
+        [totals[field] for field in ROLLUP_SUM_FIELDS]
+        + [totals["hr_zone_times"][:, zone] for zone in range(HR_ZONES)]
+        + [totals[field] for field in ROLLUP_MAX_FIELDS]
+        + [totals["ctl_start"], totals["ctl_end"]]
+    )
+    return [
+        (day, *(None if np.isnan(value) else float(value) for value in values))
+        for day, values in zip(days, zip(*columns))
+    ]
+
+
+class RollupIndex:
+    """Prefix sums and a sparse range-max table over one athlete's daily rollups."""
+
+    __slots__ = ("first_day", "days", "prefix", "max_levels", "ctl_start", "ctl_end", "prev_ctl", "next_ctl", "digest")
+
+    def __init__(self, rows: list):
+        self.first_day = date_ordinal(rows[0][0]) if rows else 0
+        self.days = date_ordinal(rows[-1][0]) - self.first_day + 1 if rows else 0
+
+        data = np.zeros((self.days, len(ROLLUP_COLUMNS)))
+        data[:, -2:] = np.nan
+        if rows:
+            offsets = np.array([date_ordinal(row[0]) - self.first_day for row in rows])
+            data[offsets] = np.array([row[1:] for row in rows], dtype=np.float64)
+        # Identifies the data, so reports rendered from equal rollups can be reused
+        self.digest = hashlib.blake2b(struct.pack("<q", self.first_day) + data.tobytes(), digest_size=16).digest()
+
+        additive = len(ROLLUP_SUM_FIELDS) + HR_ZONES
+        self.prefix = np.vstack([np.zeros((1, additive)), np.cumsum(data[:, :additive], axis=0)])
+
+        # max_levels[k][i] is the max over days i .. i + 2**k - 1
+        self.max_levels = [data[:, additive:additive + len(ROLLUP_MAX_FIELDS)]]
+        while (1 << len(self.max_levels)) <= self.days:
+            previous = self.max_levels[-1]
+            half = 1 << (len(self.max_levels) - 1)
+            self.max_levels.append(np.maximum(previous[:-half], previous[half:]))
+
+        # Per-day CTL follows list order (newest activity first), like ActivityTable.totals()
+        self.ctl_start = data[:, -2]
+        self.ctl_end = data[:, -1]
+        day_index = np.arange(self.days)
+        has_ctl = ~np.isnan(self.ctl_start)
+        self.prev_ctl = np.maximum.accumulate(np.where(has_ctl, day_index, -1))
+        self.next_ctl = np.minimum.accumulate(np.where(has_ctl, day_index, self.days)[::-1])[::-1]
+
+    def window(self, oldest_date: str, newest_date: str) -> dict:
+        """Totals for [oldest_date, newest_date] in the same shape as ActivityTable.totals()."""
+        lo = max(date_ordinal(oldest_date) - self.first_day, 0)
+        hi = min(date_ordinal(newest_date) - self.first_day, self.days - 1)
+        if lo > hi:
+            return dict(
+                {field: 0.0 for field in ROLLUP_SUM_FIELDS + ROLLUP_MAX_FIELDS},
+                hr_zone_times=np.zeros(HR_ZONES), ctl_start=np.nan, ctl_end=np.nan,
+            )
+
+        sums = np.maximum(self.prefix[hi + 1] - self.prefix[lo], 0.0)  # Clamp float round-off
+        level = (hi - lo + 1).bit_length() - 1
+        maxima = np.maximum(self.max_levels[level][lo], self.max_levels[level][hi - (1 << level) + 1])
+        latest, earliest = self.prev_ctl[hi], self.next_ctl[lo]
+
+        totals = dict(zip(ROLLUP_SUM_FIELDS, sums[:len(ROLLUP_SUM_FIELDS)]))
+        totals.update(zip(ROLLUP_MAX_FIELDS, maxima))
+        totals["hr_zone_times"] = sums[len(ROLLUP_SUM_FIELDS):]
+        totals["ctl_start"] = self.ctl_start[latest] if latest >= lo else np.nan
+        totals["ctl_end"] = self.ctl_end[earliest] if earliest <= hi else np.nan
+        return totals
+
+
+# CTL (fitness) and ATL (fatigue) are exponentially weighted averages of daily training
+# load, with the same time constants intervals.icu uses. Like intervals.icu they count
+# every sport, so their load is kept per day in daily_load rather than taken from the
+# rollups, which only cover INCLUDED_TYPES.
+FITNESS_DAYS = 42
+FATIGUE_DAYS = 7
+CTL_DECAY = math.exp(-1 / FITNESS_DAYS)
+ATL_DECAY = math.exp(-1 / FATIGUE_DAYS)
+
+
+def daily_load_rows(activities: list) -> list:
+    """One (day, training load, CTL, ATL) row per day with activities of any type. CTL and
+    ATL are what intervals.icu reported on the day's first activity that has them."""
+    by_day = {}
+    for act in sorted(activities, key=lambda act: act.get("start_date_local") or ""):
+        day = (act.get("start_date_local") or "")[:10]
+        if not day:
+            continue
+        load, ctl, atl = by_day.get(day, (0.0, None, None))
+        if ctl is None and act.get("icu_ctl") is not None:
+            ctl, atl = act.get("icu_ctl"), act.get("icu_atl")
+        by_day[day] = (load + (act.get("icu_training_load") or 0), ctl, atl)
+    return [(day, *values) for day, values in sorted(by_day.items())]
+
+
+class FitnessSeries:
+    """Daily training load with CTL and ATL for every day from the first one with data.
+
+    Each day's values follow from the day before, so a new day costs O(1) and a changed
+    day only recomputes the days after it. The values before the first day are seeded
+    from the earliest CTL and ATL intervals.icu reported, so a short stored history
+    starts close to the right level instead of at zero.
+    """
+    __slots__ = ("first_day", "seed_ctl", "seed_atl", "load", "ctl", "atl")
+
+    def __init__(self, first_day: int, seed_ctl: float, seed_atl: float):
+        self.first_day = first_day
+        self.seed_ctl = seed_ctl
+        self.seed_atl = seed_atl
+        self.load = []
+        self.ctl = []
+        self.atl = []
+
+    @classmethod
+    def from_rows(cls, rows: list) -> "FitnessSeries":
+        """From (day, training load, ctl, atl) daily_load rows in day order."""
+        if not rows:
+            return cls(0, 0.0, 0.0)
+        seed_ctl, seed_atl = next(((ctl, atl) for _, _, ctl, atl in rows if ctl is not None), (0.0, None))
+        # Activities stored before ATL was requested only have CTL
+        series = cls(date_ordinal(rows[0][0]), seed_ctl, seed_ctl if seed_atl is None else seed_atl)
+        series.update(series.first_day, rows)
+        return series
+
+    def update(self, first_changed: int, rows: list):
+        """Replace the loads from day ``first_changed`` on with ``rows`` and recompute from there."""
+        start = min(max(first_changed - self.first_day, 0), len(self.load))
+        del self.load[start:], self.ctl[start:], self.atl[start:]
+        for day, load, *_ in rows:
+            offset = date_ordinal(day) - self.first_day
+            if offset >= start:
+                self.load.extend([0.0] * (offset + 1 - len(self.load)))
+                self.load[offset] += load or 0.0
+
+        ctl = self.ctl[-1] if self.ctl else self.seed_ctl
+        atl = self.atl[-1] if self.atl else self.seed_atl
+        for load in self.load[start:]:
+            ctl = ctl * CTL_DECAY + load * (1 - CTL_DECAY)
+            atl = atl * ATL_DECAY + load * (1 - ATL_DECAY)
+            self.ctl.append(ctl)
+            self.atl.append(atl)
+
+    def window(self, oldest: int, newest: int) -> tuple:
+        """(CTL, ATL) arrays for the day ordinals [oldest, newest]. Days before the series hold
+        the seed; days after it decay as if nothing was done since."""
+        offsets = np.arange(oldest, newest + 1) - self.first_day
+        if not self.load:
+            return np.zeros(len(offsets)), np.zeros(len(offsets))
+        last = len(self.load) - 1
+        lo, hi = min(max(int(offsets[0]), 0), last), min(max(int(offsets[-1]), 0), last)
+        index = np.clip(offsets, lo, hi) - lo
+        idle = np.maximum(offsets - last, 0)
+        ctl = np.where(offsets < 0, self.seed_ctl, np.array(self.ctl[lo:hi + 1])[index] * CTL_DECAY ** idle)
+        atl = np.where(offsets < 0, self.seed_atl, np.array(self.atl[lo:hi + 1])[index] * ATL_DECAY ** idle)
+        return ctl, atl
+
+
+async def get_window_totals(athlete_id: str, oldest_date: str, newest_date: str) -> tuple:
+    """The athlete's totals for the window and the digest of the rollups they were taken from."""
+    if oldest_date < snapshot_horizon():
+        # Long windows need only the rollups, not the activities a snapshot would hold in memory
+        await sync_activities(athlete_id, oldest_date, newest_date)
+        rollups = await asyncio.to_thread(activity_store.rollup_index, athlete_id)
+    else:
+        rollups = (await athlete_snapshots.get(athlete_id)).rollups
+    return rollups.window(oldest_date, newest_date), rollups.digest
+
+async def get_fitness_window(athlete_id: str, oldest_date: str, newest_date: str) -> tuple:
+    """Daily (CTL, ATL) arrays for the window from the athlete's maintained FitnessSeries."""
+    await sync_activities(athlete_id, oldest_date, newest_date)
+    return await asyncio.to_thread(activity_store.fitness_window, athlete_id, oldest_date, newest_date)
+
+async def fetch_athlete_power_curve(athlete_id: str, curves: str):
+    """First PowerCurve from the athlete power-curves endpoint (empty if there is none), None on error.
 
-        secs_list = power_data[0]["secs"]
-        values_list = power_data[0]["values"]
+    ``curves`` is an intervals.icu curve spec such as "all", "84d" or "r.2024-01-01.2024-01-31".
+    """
+    params = {"curves": curves, "type": "Ride"}
+    status, data = await api_get(f"/athlete/{athlete_id}/power-curves", params)
+    if status != 200:
+        print(f"Error fetching power curves for athlete {athlete_id}: {status} - {data}")
+        return None
+    power_data = data.get("list", [])
+    return PowerCurve.from_api(power_data[0] if power_data else {})
 
-        best_efforts = {}
-        durations = [
-            (5, "5 sec"), (15, "15 sec"), (30, "30 sec"),
-            (300, "5 min"), (600, "10 min"), (1200, "20 min")
+async def fetch_power_curves(athlete_id: str) -> dict:
+    snapshot = await athlete_snapshots.get(athlete_id)
+    return snapshot.best_efforts()
+
+
+# =========================
+# Athlete Snapshots
+# =========================
+# Every report reads an athlete through one AthleteSnapshot: the included activities
+# since snapshot_horizon(), the daily rollups and the all-time power curve. A
+# snapshot is built once, with its sync and curve request running side by side, and
+# shared by every command until it is SNAPSHOT_TTL old or the background warmer starts
+# a new generation. A burst of different commands costs one round of fetches.
+
+BEST_EFFORT_DURATIONS = [
+    (5, "5 sec"), (15, "15 sec"), (30, "30 sec"),
+    (300, "5 min"), (600, "10 min"), (1200, "20 min")
+]
+BEST_EFFORT_COLUMNS = [label for _, label in BEST_EFFORT_DURATIONS]
+
+
+def snapshot_horizon() -> str:
+    """The default start of a snapshot: the start of the year or SNAPSHOT_WEEKS ago, whichever is earlier."""
+    today = datetime.now()
+    start_of_year = datetime(today.year, 1, 1)
+    return min(start_of_year, today - timedelta(weeks=SNAPSHOT_WEEKS)).strftime("%Y-%m-%d")
+
+
+class AthleteSnapshot:
+    __slots__ = ("athlete_id", "generation", "taken_at", "oldest", "activities", "rollups", "curve")
+
+    def __init__(self, athlete_id: str, generation: int, oldest: str, activities: list,
+                 rollups: "RollupIndex", curve):
+        self.athlete_id = athlete_id
+        self.generation = generation
+        self.taken_at = time.monotonic()
+        self.oldest = oldest
+        self.activities = activities  # INCLUDED_TYPES only, newest first
+        self.rollups = rollups
+        self.curve = curve  # All-time PowerCurve, None if it could not be fetched
+
+    def __getstate__(self):
+        # The rollups duplicate the daily_rollups table, so the warm state leaves them out
+        # and restore_warm_state() reads them back from the store
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != "rollups"}
+
+    def __setstate__(self, state: dict):
+        self.rollups = None
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def activities_between(self, oldest_date: str, newest_date: str) -> list:
+        return [
+            act for act in self.activities
+            if oldest_date <= (act.get("start_date_local") or "")[:10] <= newest_date
         ]
 
-        for duration, label in durations:
-            candidates = [val for val, secs in zip(values_list, secs_list) if secs == duration]
-            best_value = max(candidates) if candidates else 0
-            best_efforts[label] = best_value
+    def best_efforts(self) -> dict:
+        """All-time best watts for the BEST_EFFORT_COLUMNS and the weight from the curve."""
+        if not self.curve:
+            return {"best_efforts": {}, "weight": 0}
+        values = self.curve.many([duration for duration, _ in BEST_EFFORT_DURATIONS]).tolist()
+        return {"best_efforts": dict(zip(BEST_EFFORT_COLUMNS, values)), "weight": self.curve.weight}
+
+
+class SnapshotRegistry:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.generation = 0
+        self._snapshots = {}  # athlete_id -> AthleteSnapshot
+        self._builds = SingleFlight()
+
+    def new_generation(self):
+        """Make every snapshot stale, so the next read of each athlete builds a fresh one."""
+        self.generation += 1
+
+    def _usable(self, snapshot, oldest: str) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.generation == self.generation
+            and time.monotonic() - snapshot.taken_at < self.ttl
+            and snapshot.oldest <= oldest
+        )
+
+    async def get(self, athlete_id: str) -> AthleteSnapshot:
+        """The athlete's current snapshot, covering snapshot_horizon() onwards. Windows that
+        start earlier are answered from the store by their callers, so it never grows past it."""
+        oldest = snapshot_horizon()
+        snapshot = self._snapshots.get(athlete_id)
+        if self._usable(snapshot, oldest):
+            metrics.inc("ted_snapshot_total", result="hit")
+            return snapshot
+
+        generation = self.generation
+        snapshot = await self._builds.run(
+            (athlete_id, generation, oldest), lambda: self._build(athlete_id, generation, oldest), 0
+        )
+        return snapshot
+
+    async def revalidate(self):
+        """Rebuild every held snapshot in place. Until its replacement is done, each old one
+        keeps being served, unlike after new_generation()."""
+        generation = self.generation
+        held = list(self._snapshots)
+        oldest = snapshot_horizon()
+
+        async def rebuild(athlete_id):
+            await self._builds.run(
+                (athlete_id, generation, oldest, "revalidate"),
+                lambda: self._build(athlete_id, generation, oldest), 0
+            )
+
+        await fetch_for_roster(rebuild, held)
+
+    def export(self) -> list:
+        return list(self._snapshots.values())
+
+    def restore(self, snapshots: list, age: float) -> int:
+        """Adopt snapshots saved ``age`` seconds ago by an earlier run as current. They keep
+        that age, so ones older than the TTL are rebuilt on first use. Returns how many were taken."""
+        restored = 0
+        for snapshot in snapshots:
+            if snapshot.athlete_id in self._snapshots:
+                continue
+            snapshot.generation = self.generation
+            snapshot.taken_at = time.monotonic() - age
+            self._snapshots[snapshot.athlete_id] = snapshot
+            restored += 1
+        return restored
+
+    async def _build(self, athlete_id: str, generation: int, oldest: str) -> AthleteSnapshot:
+        metrics.inc("ted_snapshot_total", result="build")
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        async def all_time_curve():
+            # Only the bests read the curve, so the other reports must not fail with it
+            try:
+                return await fetch_athlete_power_curve(athlete_id, "all")
+            except IntervalsAPIError as e:
+                print(f"Error fetching power curves for athlete {athlete_id}: {e}")
+                return None
+
+        activities, curve = await asyncio.gather(get_activities(athlete_id, oldest, today), all_time_curve())
+        rollups = await asyncio.to_thread(activity_store.rollup_index, athlete_id)
+        activities = [act for act in activities if act.get("type") in INCLUDED_TYPES]
+        current = self._snapshots.get(athlete_id)
+        if curve is None and current is not None:
+            curve = current.curve  # Keep the last curve that could be fetched
+        snapshot = AthleteSnapshot(athlete_id, generation, oldest, activities, rollups, curve)
+        if current is None or current.generation <= generation:
+            self._snapshots[athlete_id] = snapshot
+        return snapshot
+
+
+athlete_snapshots = SnapshotRegistry(SNAPSHOT_TTL)
+
 
-        weight = power_data[0].get("weight", 0)
-        return {"best_efforts": best_efforts, "weight": weight}
+# =========================
+# Report Rendering
+# =========================
+# Reports are rendered through render_cache, keyed by a fingerprint of the report, its
+# parameters and the data it is built from: the digests of the rollups that window totals
+# come from, or the inputs themselves. Rebuilding a report whose data has not changed
+# (the warmer does so every WARM_INTERVAL, and so does any request after the result
+# cache expired) skips aggregation and formatting and reuses the text.
+
+class RenderCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._texts = OrderedDict()  # fingerprint -> rendered text, least recently used first
+
+    @staticmethod
+    def fingerprint(*parts) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        _feed_fingerprint(digest, parts)
+        return digest.digest()
+
+    def get(self, key: bytes):
+        text = self._texts.get(key)
+        if text is not None:
+            self._texts.move_to_end(key)
+        metrics.inc("ted_render_cache_total", result="miss" if text is None else "hit")
+        return text
+
+    def put(self, key: bytes, text: str):
+        self._texts[key] = text
+        self._texts.move_to_end(key)
+        while len(self._texts) > self.max_entries:
+            self._texts.popitem(last=False)
+
+
+_fingerprint_float = struct.Struct("<cd")
+
+
+def _feed_fingerprint(digest, value):
+    # Walks the inputs instead of pickling them, so curves are hashed straight from their arrays
+    if isinstance(value, float):  # Includes numpy float64, whose repr is slow
+        digest.update(_fingerprint_float.pack(b"f", value))
+    elif isinstance(value, dict):
+        digest.update(b"{%d" % len(value))
+        for key, item in value.items():
+            _feed_fingerprint(digest, key)
+            _feed_fingerprint(digest, item)
+    elif isinstance(value, (list, tuple)) and value and isinstance(value[0], ActivityRecord):
+        digest.update(repr([[getattr(act, field) for field in ACTIVITY_FIELDS] for act in value]).encode())
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[%d" % len(value))
+        for item in value:
+            _feed_fingerprint(digest, item)
+    elif isinstance(value, PowerCurve):
+        digest.update(b"P%d|%r|" % (len(value), value.weight))
+        digest.update(value.secs.tobytes())
+        digest.update(value.watts.tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(b"A%d|" % value.size)
+        digest.update(value.tobytes())
     else:
-        print(f"Error fetching power curves for athlete {athlete_id}: {response.status_code} - {response.text}")
-        return {"best_efforts": {}, "weight": 0}
+        digest.update(repr(value).encode() + b"\0")
+
+
+render_cache = RenderCache(RENDER_CACHE_ENTRIES)
+
+
+async def render_once(render, *inputs) -> str:
+    """``await render()``, unless a report was already rendered from exactly ``inputs``."""
+    key = RenderCache.fingerprint(*inputs)
+    text = render_cache.get(key)
+    if text is None:
+        text = await render()
+        render_cache.put(key, text)
+    return text
+
+
+def code_block(header: str, rows: list) -> str:
+    """A table in its own code block: header, a rule and one line per row."""
+    return "\n".join(["```", header, "-" * 30, *rows, "```"])
+
+
+def report_text(title: str, blocks: list) -> str:
+    return title + "\n" + "\n\n".join(blocks)
 
 
 # =========================
 # Formatting Functions (Now column-by-column code blocks)
 # =========================
 
-def get_personal_bests() -> str:
-    athlete_data = {}
-    for athlete_id, athlete_name in ATHLETE_IDS.items():
-        athlete_data[athlete_name] = fetch_power_curves(athlete_id)
+@coalesced
+async def get_best_efforts(roster: tuple) -> dict:
+    """All-time best efforts and weight for every athlete on the roster, keyed by athlete name."""
+    names = dict(roster)
+    roster_curves = await fetch_for_roster(fetch_power_curves, names)
+    return {names[athlete_id]: data for athlete_id, data in roster_curves.items()}
+
+
+@coalesced
+async def get_stream_bests(roster: tuple, durations: tuple) -> dict:
+    """All-time best efforts for any durations in seconds, computed from ride streams."""
+    names = dict(roster)
+    roster_bests = await fetch_for_roster(lambda athlete_id: fetch_stream_bests(athlete_id, durations), names)
+    return {names[athlete_id]: data for athlete_id, data in roster_bests.items()}
+
+
+@coalesced
+async def get_personal_bests(roster: tuple) -> str:
+    stages = metrics.stopwatch("get_personal_bests")
+    athlete_data = await get_best_efforts(roster)
+    stages.lap("fetch")
+
+    columns = BEST_EFFORT_COLUMNS
+
+    async def render():
+        max_values, max_values_wkg = await run_compute(best_effort_maxima, athlete_data, columns)
+        stages.lap("aggregate")
+        response = await run_compute(format_personal_bests, athlete_data, columns, max_values, max_values_wkg)
+        stages.lap("format")
+        return response
+
+    return await render_once(render, "personal_bests", columns, athlete_data)
 
-    columns = ["5 sec", "15 sec", "30 sec", "5 min", "10 min", "20 min"]
+
+def best_effort_maxima(athlete_data: dict, columns: list) -> tuple:
+    """The roster's best watts and W/kg for each column, to mark who holds them."""
     max_values = {col: 0 for col in columns}
     max_values_wkg = {col: 0 for col in columns}
 
@@ -193,27 +2179,26 @@ def get_personal_bests() -> str:
                 val_wkg = best_val / data["weight"]
                 if val_wkg > max_values_wkg[col]:
                     max_values_wkg[col] = val_wkg
+    return max_values, max_values_wkg
+
 
-    response = "**Personal Bests (All Time):**\n"
+def format_personal_bests(athlete_data: dict, columns: list, max_values: dict, max_values_wkg: dict) -> str:
     # Watts
+    watt_blocks = []
     for col in columns:
-        response += "```\n"
-        response += f"Athlete    | {col} (W)\n"
-        response += "-" * 30 + "\n"
+        rows = []
         for athlete_name, data in athlete_data.items():
             best_val = data["best_efforts"].get(col, 0)
             val_str = f"{best_val:.2f}"
             if best_val == max_values[col] and best_val > 0:
                 val_str += "*"
-            response += f"{athlete_name:<10} | {val_str:<10}\n"
-        response += "```\n\n"
+            rows.append(f"{athlete_name:<10} | {val_str:<10}")
+        watt_blocks.append(code_block(f"Athlete    | {col} (W)", rows))
 
     # W/kg
-    response += "**Additional Metrics (W/kg):**\n"
+    wkg_blocks = []
     for col in columns:
-        response += "```\n"
-        response += f"Athlete    | {col} (W/kg)\n"
-        response += "-" * 30 + "\n"
+        rows = []
         for athlete_name, data in athlete_data.items():
             best_val = data["best_efforts"].get(col, 0)
             weight = data["weight"]
@@ -224,144 +2209,173 @@ def get_personal_bests() -> str:
                     val_str += "*"
             else:
                 val_str = "N/A"
-            response += f"{athlete_name:<10} | {val_str:<10}\n"
-        response += "```\n\n"
+            rows.append(f"{athlete_name:<10} | {val_str:<10}")
+        wkg_blocks.append(code_block(f"Athlete    | {col} (W/kg)", rows))
 
-    return response.strip()
+    return (report_text("**Personal Bests (All Time):**", watt_blocks) + "\n\n"
+            + report_text("**Additional Metrics (W/kg):**", wkg_blocks))
 
 
-def get_year_to_date_stats() -> str:
+@coalesced
+async def get_year_to_date_stats(roster: tuple) -> str:
+    stages = metrics.stopwatch("get_year_to_date_stats")
     start_of_year = datetime(datetime.now().year, 1, 1).strftime("%Y-%m-%d")
     today = datetime.now().strftime("%Y-%m-%d")
 
-    ytd_stats = {}
-    for athlete_id, athlete_name in ATHLETE_IDS.items():
-        activities = get_activities(athlete_id, start_of_year, today)
-        total_distance = sum((act.get("distance", 0) or 0) for act in activities if act.get("type") in INCLUDED_TYPES) / 1000
-        total_duration = sum((act.get("moving_time", 0) or 0) for act in activities if act.get("type") in INCLUDED_TYPES) / 3600
-        total_training_load = sum((act.get("icu_training_load", 0) or 0) for act in activities if act.get("type") in INCLUDED_TYPES)
+    names = dict(roster)
+    roster_totals = await fetch_for_roster(
+        lambda athlete_id: get_window_totals(athlete_id, start_of_year, today), names
+    )
+    stages.lap("fetch")
+
+    named_totals = {names[athlete_id]: totals for athlete_id, (totals, _) in roster_totals.items()}
+    sources = [digest for _, digest in roster_totals.values()]
+
+    async def render():
+        ytd_stats = await run_compute(year_to_date_rows, named_totals)
+        stages.lap("aggregate")
+        response = await run_compute(format_year_to_date, ytd_stats)
+        stages.lap("format")
+        return response
 
+    return await render_once(render, "year_to_date", start_of_year, today, list(named_totals), sources)
+
+
+def year_to_date_rows(named_totals: dict) -> dict:
+    ytd_stats = {}
+    for athlete_name, totals in named_totals.items():
+        data = summarize_totals(totals, 1)
         ytd_stats[athlete_name] = {
-            "distance": total_distance,
-            "duration": total_duration,
-            "training_load": total_training_load
+            "distance": data["total_distance"],
+            "duration": data["total_duration"],
+            "training_load": data["total_training_load"]
         }
+    return ytd_stats
 
-    response = "**Year-to-Date Stats 📅:**\n"
-    # Columns: Distance(km), Duration(hrs), Training Load
-    # We'll show Athlete + one metric per code block
-
-    # Distance
-    response += "```\n"
-    response += "Athlete    | Distance (km)\n"
-    response += "-" * 30 + "\n"
-    for athlete_name, data in ytd_stats.items():
-        response += f"{athlete_name:<10} | {data['distance']:<10.2f}\n"
-    response += "```\n\n"
 
-    # Duration
-    response += "```\n"
-    response += "Athlete    | Duration (hrs)\n"
-    response += "-" * 30 + "\n"
-    for athlete_name, data in ytd_stats.items():
-        response += f"{athlete_name:<10} | {data['duration']:<10.2f}\n"
-    response += "```\n\n"
+YEAR_TO_DATE_COLUMNS = [
+    ("Distance (km)", "distance"),
+    ("Duration (hrs)", "duration"),
+    ("Training Load", "training_load"),
+]
 
-    # Training Load
-    response += "```\n"
-    response += "Athlete    | Training Load\n"
-    response += "-" * 30 + "\n"
-    for athlete_name, data in ytd_stats.items():
-        response += f"{athlete_name:<10} | {data['training_load']:<10.2f}\n"
-    response += "```\n"
 
-    return response
+def format_year_to_date(ytd_stats: dict) -> str:
+    # We'll show Athlete + one metric per code block
+    blocks = [
+        code_block(f"Athlete    | {label}", [f"{athlete_name:<10} | {data[key]:<10.2f}"
+                                            for athlete_name, data in ytd_stats.items()])
+        for label, key in YEAR_TO_DATE_COLUMNS
+    ]
+    return report_text("**Year-to-Date Stats 📅:**", blocks) + "\n"
 
 
-def get_summary(weeksago: int) -> str:
+@coalesced
+async def get_summary(roster: tuple, weeksago: int) -> str:
+    stages = metrics.stopwatch("get_summary")
     today = datetime.now()
     delta = today - timedelta(weeks=weeksago)
     oldest_date = delta.strftime("%Y-%m-%d")
     newest_date = today.strftime("%Y-%m-%d")
 
-    athlete_comps = {}
-    for athlete_id, athlete_name in ATHLETE_IDS.items():
-        activities = get_activities(athlete_id, oldest_date, newest_date)
-        data = process_activities(activities, weeksago)
-        athlete_comps[athlete_name] = data
+    names = dict(roster)
+    done = {}
 
-    # Metrics:
-    # Athlete
-    # Total Dist (km), Total Dur (hrs), Max Norm Pwr (W), Max Avg Pwr (W),
-    # Max Norm Pwr (W/kg), Max Avg Pwr (W/kg), Max eFTP
+    async def render_partial():
+        named_totals = {names[athlete_id]: done[athlete_id] for athlete_id in names if athlete_id in done}
+        athlete_comps = await run_compute(summarize_roster, named_totals, weeksago)
+        text = await run_compute(format_summary, weeksago, athlete_comps)
+        return text + pending_footer(len(names) - len(named_totals), len(names))
 
-    response = f"**Performance Summary (Last {weeksago} week(s))**\n"
+    def on_result(athlete_id, result):
+        done[athlete_id] = result[0]
+        publish_progress(render_partial)
 
-    # Total Dist (km)
-    response += "```\n"
-    response += "Athlete    | Total Dist (km)\n"
-    response += "-" * 30 + "\n"
-    for ath, d in athlete_comps.items():
-        response += f"{ath:<10} | {d['total_distance']:<10.2f}\n"
-    response += "```\n\n"
+    roster_totals = await fetch_for_roster(
+        lambda athlete_id: get_window_totals(athlete_id, oldest_date, newest_date), names, on_result
+    )
+    stages.lap("fetch")
 
-    # Total Dur (hrs)
-    response += "```\n"
-    response += "Athlete    | Total Dur (hrs)\n"
-    response += "-" * 30 + "\n"
-    for ath, d in athlete_comps.items():
-        response += f"{ath:<10} | {d['total_duration']:<10.2f}\n"
-    response += "```\n\n"
+    named_totals = {names[athlete_id]: totals for athlete_id, (totals, _) in roster_totals.items()}
+    sources = [digest for _, digest in roster_totals.values()]
 
-    # Max Norm Pwr (W)
-    response += "```\n"
-    response += "Athlete    | Max Norm Pwr (W)\n"
-    response += "-" * 30 + "\n"
-    for ath, d in athlete_comps.items():
-        response += f"{ath:<10} | {d['max_normalized_power']:<10.2f}\n"
-    response += "```\n\n"
+    async def render():
+        athlete_comps = await run_compute(summarize_roster, named_totals, weeksago)
+        stages.lap("aggregate")
+        response = await run_compute(format_summary, weeksago, athlete_comps)
+        stages.lap("format")
+        return response
 
-    # Max Avg Pwr (W)
-    response += "```\n"
-    response += "Athlete    | Max Avg Pwr (W)\n"
-    response += "-" * 30 + "\n"
-    for ath, d in athlete_comps.items():
-        response += f"{ath:<10} | {d['max_avg_power']:<10.2f}\n"
-    response += "```\n\n"
+    return await render_once(render, "summary", weeksago, oldest_date, newest_date, list(named_totals), sources)
 
-    # Max Norm Pwr (W/kg)
-    response += "```\n"
-    response += "Athlete    | Max Norm Pwr (W/kg)\n"
-    response += "-" * 30 + "\n"
-    for ath, d in athlete_comps.items():
-        response += f"{ath:<10} | {d['max_normalized_power_per_kg']:<10.2f}\n"
-    response += "```\n\n"
 
-    # Max Avg Pwr (W/kg)
-    response += "```\n"
-    response += "Athlete    | Max Avg Pwr (W/kg)\n"
-    response += "-" * 30 + "\n"
-    for ath, d in athlete_comps.items():
-        response += f"{ath:<10} | {d['max_avg_power_per_kg']:<10.2f}\n"
-    response += "```\n\n"
+def pending_footer(pending: int, total: int) -> str:
+    return f"\n⏳ Waiting for {pending} of {total} athletes..." if pending else ""
 
-    # Max eFTP
-    response += "```\n"
-    response += "Athlete    | Max eFTP\n"
-    response += "-" * 30 + "\n"
-    for ath, d in athlete_comps.items():
-        response += f"{ath:<10} | {d['max_pm_ftp']:<10.2f}\n"
-    response += "```\n"
 
-    return response
+SUMMARY_COLUMNS = [
+    ("Total Dist (km)", "total_distance"),
+    ("Total Dur (hrs)", "total_duration"),
+    ("Max Norm Pwr (W)", "max_normalized_power"),
+    ("Max Avg Pwr (W)", "max_avg_power"),
+    ("Max Norm Pwr (W/kg)", "max_normalized_power_per_kg"),
+    ("Max Avg Pwr (W/kg)", "max_avg_power_per_kg"),
+    ("Max eFTP", "max_pm_ftp"),
+]
 
 
-def get_weekly_highlights(weeksago: int = 1) -> str:
+def format_summary(weeksago: int, athlete_comps: dict) -> str:
+    blocks = [
+        code_block(f"Athlete    | {label}", [f"{ath:<10} | {d[key]:<10.2f}" for ath, d in athlete_comps.items()])
+        for label, key in SUMMARY_COLUMNS
+    ]
+    return report_text(f"**Performance Summary (Last {weeksago} week(s))**", blocks) + "\n"
+
+
+@coalesced
+async def get_weekly_highlights(roster: tuple, weeksago: int = 1) -> str:
+    stages = metrics.stopwatch("get_weekly_highlights")
     today = datetime.now()
     delta = today - timedelta(weeks=weeksago)
     oldest_date = delta.strftime("%Y-%m-%d")
     newest_date = today.strftime("%Y-%m-%d")
 
+    names = dict(roster)
+    done = {}
+
+    async def render_partial():
+        named_inputs = {names[athlete_id]: done[athlete_id] for athlete_id in names if athlete_id in done}
+        highlights = await run_compute(compute_highlights, named_inputs)
+        text = await run_compute(format_highlights, weeksago, highlights)
+        return text + pending_footer(len(names) - len(named_inputs), len(names))
+
+    def on_result(athlete_id, inputs):
+        done[athlete_id] = inputs
+        publish_progress(render_partial)
+
+    missing_curves = []
+    roster_inputs = await fetch_for_roster(
+        lambda athlete_id: fetch_highlight_inputs(athlete_id, oldest_date, newest_date, missing_curves),
+        names, on_result
+    )
+    stages.lap("fetch")
+    warm_activity_power_curves(missing_curves)
+
+    named_inputs = {names[athlete_id]: inputs for athlete_id, inputs in roster_inputs.items()}
+
+    async def render():
+        highlights = await run_compute(compute_highlights, named_inputs)
+        stages.lap("aggregate")
+        response = await run_compute(format_highlights, weeksago, highlights)
+        stages.lap("format")
+        return response
+
+    return await render_once(render, "highlights", weeksago, named_inputs)
+
+
+def compute_highlights(named_inputs: dict) -> dict:
+    """Best single-activity values and who set them, from fetch_highlight_inputs results
+    keyed by athlete name in roster order."""
     highlights = {
         "Max 15s Power (W)": {"value": 0, "athlete": ""},
         "Max 15s Power (W/kg)": {"value": 0.0, "athlete": ""},
@@ -373,23 +2387,12 @@ def get_weekly_highlights(weeksago: int = 1) -> str:
         "Most Elevation Gain (m)": {"value": 0, "athlete": ""}
     }
 
-    for athlete_id, athlete_name in ATHLETE_IDS.items():
-        activities = get_activities(athlete_id, oldest_date, newest_date)
+    # Merge in roster order so ties still go to the athlete listed first
+    for athlete_name, (_, efforts) in named_inputs.items():
 
-        for activity in activities:
-            if activity.get("type") not in INCLUDED_TYPES:
-                continue
-
-            power_curve_data = {}
-            if activity.get("type") in CYCLING_TYPES:
-                aid = activity.get("id", "")
-                if aid:
-                    power_curve_data = get_activity_power_curve(aid)
-
-            max_15_sec_power = get_best_effort_power(power_curve_data, 15) if power_curve_data else 0
-            max_20_min_power = get_best_effort_power(power_curve_data, 1200) if power_curve_data else 0
+        for weight, power_curve in efforts:
+            max_15_sec_power, max_20_min_power = power_curve.many((15, 1200)).tolist()
 
-            weight = activity.get("icu_weight", 0) or 0
             max_15s_w_kg = (max_15_sec_power / weight) if (weight > 0 and max_15_sec_power > 0) else 0
             max_20m_w_kg = (max_20_min_power / weight) if (weight > 0 and max_20_min_power > 0) else 0
 
@@ -405,92 +2408,518 @@ def get_weekly_highlights(weeksago: int = 1) -> str:
             if max_20m_w_kg > highlights["Max 20m Power (W/kg)"]["value"]:
                 highlights["Max 20m Power (W/kg)"] = {"value": max_20m_w_kg, "athlete": athlete_name}
 
-            single_duration = (activity.get("moving_time", 0) or 0) / 3600.0
-            if single_duration > highlights["Longest Duration (hrs)"]["value"]:
-                highlights["Longest Duration (hrs)"] = {"value": single_duration, "athlete": athlete_name}
-
-            single_distance = (activity.get("distance", 0) or 0) / 1000.0
-            if single_distance > highlights["Longest Distance (km)"]["value"]:
-                highlights["Longest Distance (km)"] = {"value": single_distance, "athlete": athlete_name}
-
-            athlete_max_hr = activity.get("athlete_max_hr", 0) or 0
-            max_heartrate = activity.get("max_heartrate", 0) or 0
-            max_hr_percent = 0.0
-            if athlete_max_hr > 0 and max_heartrate > 0:
-                max_hr_percent = (max_heartrate / athlete_max_hr) * 100.0
+    table = ActivityTable([activities for activities, _ in named_inputs.values()])
+    athlete_names = list(named_inputs)
 
-            if max_hr_percent > highlights["Max % of Max HR"]["value"]:
-                highlights["Max % of Max HR"] = {"value": max_hr_percent, "athlete": athlete_name, "hr_value": max_heartrate}
+    single_activity_metrics = [
+        ("Longest Duration (hrs)", table.moving_time / 3600.0),
+        ("Longest Distance (km)", table.distance / 1000.0),
+        ("Most Elevation Gain (m)", table.elevation_gain),
+    ]
+    for category, values in single_activity_metrics:
+        row = table.best_single(values)
+        if row is not None:
+            highlights[category] = {"value": float(values[row]), "athlete": athlete_names[table.athlete[row]]}
+
+    max_hr_percent = table.max_hr_percent()
+    row = table.best_single(max_hr_percent)
+    if row is not None:
+        highlights["Max % of Max HR"] = {
+            "value": float(max_hr_percent[row]),
+            "athlete": athlete_names[table.athlete[row]],
+            "hr_value": int(round(table.max_heartrate[row])),
+        }
+    return highlights
 
-            elevation_gain = activity.get("total_elevation_gain", 0) or 0
-            if elevation_gain > highlights["Most Elevation Gain (m)"]["value"]:
-                highlights["Most Elevation Gain (m)"] = {"value": elevation_gain, "athlete": athlete_name}
 
+def format_highlights(weeksago: int, highlights: dict) -> str:
     # Each highlight in its own code block
     # Just 2 columns: Athlete and Value, since we can't horizontally scroll well.
-    response = f"**Best single activity highlights last {weeksago} week(s) 📈:**\n"
-
+    blocks = []
     for category, data in highlights.items():
-        response += "```\n"
-        response += f"{'Athlete':<10} | {category}\n"
-        response += "-" * 30 + "\n"
         val = data["value"]
         if category == "Max % of Max HR" and data["hr_value"] > 0:
             val_str = f"{val:.2f}({data['hr_value']}bpm)"
         else:
             val_str = f"{val:.2f}"
+        blocks.append(code_block(f"{'Athlete':<10} | {category}", [f"{data['athlete']:<10} | {val_str:<10}"]))
+
+    return report_text(f"**Best single activity highlights last {weeksago} week(s) 📈:**", blocks)
+
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+@coalesced
+async def get_trend(roster: tuple, weeks: int) -> str:
+    stages = metrics.stopwatch("get_trend")
+    today = datetime.now()
+    oldest_date = (today - timedelta(weeks=weeks)).strftime("%Y-%m-%d")
+    newest_date = today.strftime("%Y-%m-%d")
+
+    names = dict(roster)
+    roster_series = await fetch_for_roster(
+        lambda athlete_id: get_fitness_window(athlete_id, oldest_date, newest_date), names
+    )
+    stages.lap("fetch")
+
+    named_series = {names[athlete_id]: series for athlete_id, series in roster_series.items()}
+
+    async def render():
+        rows = await run_compute(trend_rows, named_series, min(weeks, 24) + 1)
+        stages.lap("aggregate")
+        response = await run_compute(format_trend, weeks, rows)
+        stages.lap("format")
+        return response
+
+    return await render_once(render, "trend", weeks, named_series)
+
+
+def trend_rows(named_series: dict, points: int) -> dict:
+    """Current CTL, its change over the window, ATL, form (TSB = CTL - ATL) and ``points``
+    evenly spaced CTL samples for every athlete."""
+    rows = {}
+    for athlete_name, (ctl, atl) in named_series.items():
+        samples = ctl[np.linspace(0, len(ctl) - 1, points).round().astype(int)]
+        rows[athlete_name] = {
+            "ctl": float(ctl[-1]),
+            "change": float(ctl[-1] - ctl[0]),
+            "atl": float(atl[-1]),
+            "tsb": float(ctl[-1] - atl[-1]),
+            "samples": samples.tolist(),
+        }
+    return rows
+
 
-        response += f"{data['athlete']:<10} | {val_str:<10}\n"
-        response += "```\n\n"
+def format_trend(weeks: int, rows: dict) -> str:
+    header = f"{'Athlete':<10} | {'CTL':>5} | {'Δ CTL':>6} | {'ATL':>5} | {'TSB':>6}"
+    table = [
+        f"{athlete_name:<10} | {row['ctl']:>5.1f} | {row['change']:>+6.1f} | {row['atl']:>5.1f} | {row['tsb']:>+6.1f}"
+        for athlete_name, row in rows.items()
+    ]
+
+    # One scale for the whole roster, so the curves can be compared with each other
+    samples = [value for row in rows.values() for value in row["samples"]]
+    low, high = (min(samples), max(samples)) if samples else (0.0, 0.0)
+    span = (high - low) or 1.0
+    curves = [
+        f"{athlete_name:<10} | "
+        + "".join(SPARK_CHARS[round((value - low) / span * (len(SPARK_CHARS) - 1))] for value in row["samples"])
+        for athlete_name, row in rows.items()
+    ]
+
+    return report_text(f"**Fitness trend last {weeks} week(s) 📈:**", [
+        code_block(header, table),
+        code_block(f"{'Athlete':<10} | Fitness (CTL {low:.0f}-{high:.0f})", curves),
+    ])
+
+# =========================
+# Background Report Warming
+# =========================
+# The common reports are rebuilt in the background every WARM_INTERVAL seconds and
+# once a busy spell of commands has gone quiet, so interactive commands are answered
+# from results at most REPORT_MAX_STALENESS old.
+
+class ReportWarmer:
+    def __init__(self):
+        self.last_warm = None
+        self.last_command = 0.0
+        self.revalidate_snapshots = False  # Set when snapshots were restored from the warm state
+
+    def note_command(self):
+        self.last_command = time.monotonic()
+
+    def due(self) -> bool:
+        now = time.monotonic()
+        if self.last_warm is None or now - self.last_warm >= WARM_INTERVAL:
+            return True
+        # Refresh after a burst of commands so the next burst starts warm
+        return self.last_command > self.last_warm and now - self.last_command >= WARM_QUIET_PERIOD
+
+    def reports(self) -> list:
+        reports = []
+        for roster in rosters.rosters():
+            reports += (
+                [(get_summary, (roster, weeks)) for weeks in WARM_SUMMARY_WEEKS]
+                + [(get_weekly_highlights, (roster, weeks)) for weeks in WARM_HIGHLIGHT_WEEKS]
+                + [(get_year_to_date_stats, (roster,)), (get_best_efforts, (roster,)), (get_personal_bests, (roster,))]
+            )
+        return reports
+
+
+report_warmer = ReportWarmer()
+
+
+@tasks.loop(seconds=30)
+async def warm_reports():
+    if not rosters.athlete_ids() or not report_warmer.due():
+        return
+    report_warmer.last_warm = time.monotonic()
+    if report_warmer.revalidate_snapshots:
+        # Restored snapshots keep answering commands while their replacements are built
+        report_warmer.revalidate_snapshots = False
+        try:
+            await athlete_snapshots.revalidate()
+        except Exception as e:
+            print(f"❌ Revalidating restored snapshots failed: {e}")
+            athlete_snapshots.new_generation()
+    else:
+        athlete_snapshots.new_generation()
+    for builder, args in report_warmer.reports():
+        try:
+            await builder.refresh(*args)
+        except Exception as e:
+            print(f"❌ Warming {builder.__name__}{args[1:]} for {len(args[0])} athletes failed: {e}")
+    print(f"♻️ Reports warmed in {time.monotonic() - report_warmer.last_warm:.1f}s")
+
+
+@tasks.loop(seconds=METRICS_DUMP_INTERVAL)
+async def dump_metrics():
+    try:
+        await asyncio.to_thread(write_metrics_file)
+    except OSError as e:
+        print(f"❌ Writing metrics to {METRICS_PATH} failed: {e}")
+
+
+# =========================
+# Warm State
+# =========================
+# The in-memory caches (athlete snapshots with their activities and all-time curve, and
+# the rendered reports) are pickled to WARM_STATE_PATH every WARM_STATE_INTERVAL seconds
+# and on shutdown, and read back before the bot connects. After a restart commands are
+# answered from the restored state straight away, and the first warm pass revalidates
+# it in the background. What already lives in the activity store needs nothing extra:
+# snapshot rollups are rebuilt from it, and per-ride power curves and streams stay there.
+
+WARM_STATE_MAGIC = b"TEDWARM4"  # Bump when a pickled class changes shape, so older files are ignored
+
+
+def collect_warm_state() -> dict:
+    """Everything worth keeping across a restart. Only gathers references, so it is cheap."""
+    return {
+        "saved_at": time.time(),
+        "snapshots": athlete_snapshots.export(),
+        "reports": report_flights.export(),
+    }
+
+
+def write_warm_state(state: dict, path: str = None) -> int:
+    """Write ``state`` to ``path`` (default WARM_STATE_PATH) atomically. Returns its size in bytes."""
+    path = path or WARM_STATE_PATH
+    data = WARM_STATE_MAGIC + zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), 1)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def read_warm_state(path: str = None):
+    """The state saved at ``path``, or None if there is none or it is from an incompatible version."""
+    path = path or WARM_STATE_PATH
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if not data.startswith(WARM_STATE_MAGIC):
+        return None
+    return pickle.loads(zlib.decompress(memoryview(data)[len(WARM_STATE_MAGIC):]))
+
+
+def restore_warm_state(state: dict) -> tuple:
+    """Adopt a saved state. Returns how many (snapshots, reports) were restored."""
+    age = time.time() - state["saved_at"]
+    if age > WARM_STATE_MAX_AGE:
+        return 0, 0
+
+    athlete_ids = rosters.athlete_ids()
+    saved = [snapshot for snapshot in state["snapshots"] if snapshot.athlete_id in athlete_ids]
+    for snapshot in saved:
+        snapshot.rollups = activity_store.rollup_index(snapshot.athlete_id)
+    snapshots = athlete_snapshots.restore(saved, age)
+    if snapshots:
+        report_warmer.revalidate_snapshots = True
+
+    # Report keys include their roster, so reports for a roster that changed are never served
+    reports = 0
+    warmed = {(builder.__name__, *args) for builder, args in report_warmer.reports()}
+    for key, value, remaining in state["reports"]:
+        ttl = remaining - age
+        if key in warmed and age < REPORT_MAX_STALENESS:
+            # The first warm pass rebuilds these; serve the old ones until it has, but never
+            # past REPORT_MAX_STALENESS since the file was written
+            ttl = max(ttl, min(WARM_STATE_GRACE, REPORT_MAX_STALENESS - age))
+        if ttl > 0:
+            report_flights.restore(key, value, ttl)
+            reports += 1
+    return snapshots, reports
+
+
+async def load_warm_state():
+    started = time.perf_counter()
+    try:
+        state = await asyncio.to_thread(read_warm_state)
+        if state is None:
+            return
+        snapshots, reports = restore_warm_state(state)
+    except Exception as e:
+        # A damaged or outdated file only costs a cold start
+        print(f"❌ Ignoring warm state in {WARM_STATE_PATH}: {e}")
+        return
+    print(f"♻️ Restored {snapshots} athlete snapshots and {reports} reports "
+          f"in {time.perf_counter() - started:.2f}s")
+
+
+@tasks.loop(seconds=WARM_STATE_INTERVAL)
+async def save_warm_state():
+    if save_warm_state.current_loop == 0:
+        return  # Nothing new since startup
+    try:
+        # Collected on the loop so the caches are not changed under the pickler
+        await asyncio.to_thread(write_warm_state, collect_warm_state())
+    except (OSError, pickle.PicklingError) as e:
+        print(f"❌ Saving warm state to {WARM_STATE_PATH} failed: {e}")
+
+
+# =========================
+# Streaming Report Delivery
+# =========================
+# A report that has to be built is posted straight away and then edited in place as
+# athletes finish, so the first rows show up after about one athlete's fetch instead of
+# after the whole roster. Edits are spaced at least STREAM_EDIT_INTERVAL apart to stay
+# inside Discord's edit rate limit, and only the newest partial version is rendered.
+# Reports longer than DISCORD_MESSAGE_LIMIT are split over several messages; while the
+# report is built only the first one is streamed, the rest are sent when it is done.
+
+def split_message(text: str, limit: int = DISCORD_MESSAGE_LIMIT) -> list:
+    """Split ``text`` into messages of at most ``limit`` characters.
+
+    Cuts go between blank-line separated parts where possible, otherwise between lines,
+    and a code block that is cut in two is closed and reopened so both halves render.
+    """
+    if len(text) <= limit:
+        return [text]
+    chunks, current = [], ""
+    for part in _message_parts(text, limit):
+        if current and len(current) + 2 + len(part) > limit:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{part}" if current else part
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _message_parts(text: str, limit: int):
+    """The blank-line separated parts of ``text`` (blank lines inside code blocks do not count)."""
+    part, in_block = [], False
+    for line in text.split("\n"):
+        if not line and not in_block:
+            if part:
+                yield from _cut_part(part, limit)
+            part = []
+            continue
+        if line.startswith("```"):
+            in_block = not in_block
+        part.append(line)
+    if part:
+        yield from _cut_part(part, limit)
+
+
+def _cut_part(lines: list, limit: int):
+    width = limit - 8  # A single line longer than a message is wrapped at this width
+    piece, size, in_block = [], -1, False
+    for line in (text[i:i + width] for text in lines for i in range(0, max(len(text), 1), width)):
+        # Leave room to close the code block if the piece ends inside one
+        if piece and size + 1 + len(line) + 4 > limit:
+            yield "\n".join(piece + ["```"] if in_block else piece)
+            piece, size = (["```"], 3) if in_block else ([], -1)
+        piece.append(line)
+        size += 1 + len(line)
+        if line.startswith("```"):
+            in_block = not in_block
+    if piece:
+        yield "\n".join(piece)
+
+
+async def send_report(ctx, text: str) -> list:
+    return [await ctx.send(chunk) for chunk in split_message(text)]
+
+
+class ReportStream:
+    def __init__(self, ctx, placeholder: str):
+        self.ctx = ctx
+        self.placeholder = placeholder
+        self.messages = []  # Messages the report is shown in, first one first
+        self._shown = []  # Text of each message
+        self._render = None
+        self._changed = asyncio.Event()
+        self._last_edit = 0.0
+        self._task = None
+        self._edit = None  # The pump's edit in flight
+
+    async def __aenter__(self):
+        await self.show(self.placeholder)
+        self._task = asyncio.get_running_loop().create_task(self._pump())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._stop()
+        if exc_type is not None:
+            # The build failed: drop the placeholder or partial report, the error is reported separately
+            for message in self.messages:
+                try:
+                    await message.delete()
+                except discord.HTTPException as e:
+                    print(f"❌ Removing streamed report failed: {e}")
+            self.messages, self._shown = [], []
+
+    async def _stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._edit is not None:
+            # Let an edit already in flight finish, so a message it sends is known and reused
+            await asyncio.gather(self._edit, return_exceptions=True)
+            self._edit = None
+
+    def update(self, render):
+        """Progress callback: remember the newest partial report and schedule an edit."""
+        self._render = render
+        self._changed.set()
+
+    async def _pump(self):
+        while True:
+            await self._changed.wait()
+            wait = self._last_edit + STREAM_EDIT_INTERVAL - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._changed.clear()
+            text = await self._render()
+            # Shielded so stopping the pump never cuts an edit off halfway
+            self._edit = asyncio.ensure_future(self.show(text, partial=True))
+            try:
+                await asyncio.shield(self._edit)
+            except discord.HTTPException as e:
+                print(f"❌ Updating streamed report failed: {e}")
+            self._edit = None
+
+    async def show(self, text: str, partial: bool = False):
+        chunks = split_message(text)
+        if partial:
+            # Only the first message is edited per round, so progress never multiplies the edit rate
+            chunks = chunks[:1] + self._shown[1:]
+        if chunks == self._shown:
+            return
+        for i, chunk in enumerate(chunks):
+            if i >= len(self.messages):
+                self.messages.append(await self.ctx.send(chunk))
+            elif chunk != self._shown[i]:
+                await self.messages[i].edit(content=chunk)
+        # A partial report can need more messages than the finished one
+        for message in self.messages[len(chunks):]:
+            await message.delete()
+        del self.messages[len(chunks):]
+        self._shown = chunks
+        self._last_edit = time.monotonic()
+
+    async def finish(self, text: str):
+        await self._stop()
+        await self.show(text)
 
-    return response.strip()
 
 # =========================
 # Discord Commands
 # =========================
 
+async def command_roster(ctx) -> tuple:
+    """The roster of the server the command came from. If it is empty, says how to fill it."""
+    roster = rosters.for_guild(ctx.guild.id if ctx.guild else None)
+    if not roster:
+        await ctx.send("There are no athletes on this server's roster yet. "
+                       "Add them with !roster add <athlete id> <name>.")
+    return roster
+
 @bot.command(name="summary")
 async def cmd_summary(ctx, arg):
     try:
         weeksago = int(arg)
-        await ctx.send(f"Generating summary for the last {weeksago} week(s)... This may take a moment.")
-        summary_text = get_summary(weeksago)
-        await ctx.send(summary_text)
     except ValueError:
         await ctx.send("Please provide a valid number of weeks (e.g., !summary 1).")
+        return
+    roster = await command_roster(ctx)
+    if not roster:
+        return
+    if get_summary.is_cached(roster, weeksago):
+        await send_report(ctx, await get_summary(roster, weeksago))
+        return
+    placeholder = f"Generating summary for the last {weeksago} week(s)... This may take a moment."
+    async with ReportStream(ctx, placeholder) as stream:
+        summary_text = await get_summary.stream(stream.update, roster, weeksago)
+        await stream.finish(summary_text)
 
 @bot.command(name="highlights")
 async def cmd_weekly_highlights(ctx, weeksago: int = 1):
-    await ctx.send("Fetching weekly highlights...")
-    response = get_weekly_highlights(weeksago)
-    await ctx.send(response)
+    roster = await command_roster(ctx)
+    if not roster:
+        return
+    if get_weekly_highlights.is_cached(roster, weeksago):
+        await send_report(ctx, await get_weekly_highlights(roster, weeksago))
+        return
+    async with ReportStream(ctx, "Fetching weekly highlights...") as stream:
+        response = await get_weekly_highlights.stream(stream.update, roster, weeksago)
+        await stream.finish(response)
 
 @bot.command(name="ytd")
 async def cmd_year_to_date(ctx):
-    await ctx.send("Calculating Year-to-Date stats...")
-    response = get_year_to_date_stats()
-    await ctx.send(response)
+    roster = await command_roster(ctx)
+    if not roster:
+        return
+    if not get_year_to_date_stats.is_cached(roster):
+        await ctx.send("Calculating Year-to-Date stats...")
+    response = await get_year_to_date_stats(roster)
+    await send_report(ctx, response)
+
+@bot.command(name="trend")
+async def cmd_trend(ctx, weeks: int = 6):
+    if not 1 <= weeks <= MAX_TREND_WEEKS:
+        await ctx.send(f"Please provide a number of weeks from 1 to {MAX_TREND_WEEKS} (e.g., !trend 6).")
+        return
+    roster = await command_roster(ctx)
+    if not roster:
+        return
+    if not get_trend.is_cached(roster, weeks):
+        await ctx.send("Calculating fitness trends...")
+    await send_report(ctx, await get_trend(roster, weeks))
 
 @bot.command(name="bests")
-async def cmd_bests(ctx):
-    await ctx.send("Fetching personal bests for all athletes... This may take a moment.")
-    athlete_data = {}
-    for athlete_id, athlete_name in ATHLETE_IDS.items():
-        athlete_data[athlete_name] = fetch_power_curves(athlete_id)
-
-    columns = ["5 sec", "15 sec", "30 sec", "5 min", "10 min", "20 min"]
-    max_values = {col: 0 for col in columns}
-    max_values_wkg = {col: 0 for col in columns}
+async def cmd_bests(ctx, *durations):
+    if durations:
+        seconds = [parse_duration(text) for text in durations]
+        if None in seconds or len(seconds) > MAX_CUSTOM_BESTS:
+            await ctx.send(f"Please give up to {MAX_CUSTOM_BESTS} durations like 90s, 5m or 1h "
+                           "(e.g., !bests 90s 60m).")
+            return
+        roster = await command_roster(ctx)
+        if not roster:
+            return
+        seconds = tuple(sorted(set(seconds)))
+        if not get_stream_bests.is_cached(roster, seconds):
+            await ctx.send("Computing bests from every ride's power data...")
+        athlete_data = await get_stream_bests(roster, seconds)
+        columns = [duration_label(s) for s in seconds]
+    else:
+        roster = await command_roster(ctx)
+        if not roster:
+            return
+        if not get_best_efforts.is_cached(roster):
+            await ctx.send("Fetching personal bests for all athletes... This may take a moment.")
+        athlete_data = await get_best_efforts(roster)
+        columns = BEST_EFFORT_COLUMNS
 
-    for data in athlete_data.values():
-        for col in columns:
-            best_val = data["best_efforts"].get(col, 0)
-            if best_val > max_values[col]:
-                max_values[col] = best_val
-            if data["weight"] > 0:
-                val_wkg = best_val / data["weight"]
-                if val_wkg > max_values_wkg[col]:
-                    max_values_wkg[col] = val_wkg
+    max_values, max_values_wkg = await run_compute(best_effort_maxima, athlete_data, columns)
 
     embed = discord.Embed(title="Personal Bests (All Time)", color=discord.Color.blue())
 
@@ -521,16 +2950,92 @@ async def cmd_bests(ctx):
             value_list.append(f"**{athlete_name}**: {val_str}")
         embed.add_field(name=f"{col} (W/kg)", value="\n".join(value_list), inline=False)
 
-    await ctx.send(embed=embed)
+    # Large rosters outgrow Discord's embed limits; the same tables fit in plain messages
+    if len(embed) > 6000 or any(len(field.value) > 1024 for field in embed.fields):
+        text = await run_compute(format_personal_bests, athlete_data, columns, max_values, max_values_wkg)
+        await send_report(ctx, text)
+    else:
+        await ctx.send(embed=embed)
+
+    missing = sum(data.get("missing", 0) for data in athlete_data.values())
+    if missing:
+        await ctx.send(f"⏳ {missing} rides are still being downloaded and are not counted yet. "
+                       "Ask again in a few minutes for the complete bests.")
+
+
+async def can_edit_roster(ctx) -> bool:
+    if ctx.guild is None:
+        await ctx.send("Rosters belong to a server, so please change them from one of its channels.")
+        return False
+    if ctx.author.id != OWNER_ID and not ctx.author.guild_permissions.manage_guild:
+        await ctx.send("Sorry, only members who can manage this server can change its roster.")
+        return False
+    return True
+
+def format_roster(roster: tuple, own: bool) -> str:
+    title = f"**Roster ({len(roster)} athletes{'' if own else ', default'}):**"
+    if not roster:
+        return title + "\nNo athletes yet. Add them with !roster add <athlete id> <name>."
+    rows = [f"{name:<10} | {athlete_id}" for athlete_id, name in roster]
+    return report_text(title, [code_block(f"{'Athlete':<10} | intervals.icu id", rows)])
+
+@bot.group(name="roster", invoke_without_command=True)
+async def cmd_roster(ctx):
+    guild_id = ctx.guild.id if ctx.guild else None
+    await send_report(ctx, format_roster(rosters.for_guild(guild_id), rosters.has_own(guild_id)))
+
+@cmd_roster.command(name="list")
+async def cmd_roster_list(ctx):
+    await cmd_roster(ctx)
+
+@cmd_roster.command(name="add")
+async def cmd_roster_add(ctx, athlete_id: str, *, name: str):
+    if not await can_edit_roster(ctx):
+        return
+    name = name.strip()
+    if not ATHLETE_ID_PATTERN.fullmatch(athlete_id) or not name or len(name) > MAX_ATHLETE_NAME:
+        await ctx.send(f"Please give an intervals.icu athlete id and a name of up to {MAX_ATHLETE_NAME} "
+                       "characters (e.g., !roster add i12345 Eivind).")
+        return
+    if any(other == name and other_id != athlete_id for other_id, other in rosters.for_guild(ctx.guild.id)):
+        await ctx.send(f"Someone called {name} is already on the roster, please pick another name.")
+        return
+    roster = await rosters.add(ctx.guild.id, athlete_id, name)
+    await ctx.send(f"✅ {name} ({athlete_id}) is on the roster, which now has {len(roster)} athletes.")
+
+@cmd_roster.command(name="remove")
+async def cmd_roster_remove(ctx, *, athlete: str):
+    if not await can_edit_roster(ctx):
+        return
+    athlete = athlete.strip()
+    match = next(((aid, name) for aid, name in rosters.for_guild(ctx.guild.id) if athlete in (aid, name)), None)
+    if match is None:
+        await ctx.send(f"{athlete} is not on this server's roster.")
+        return
+    roster = await rosters.remove(ctx.guild.id, match[0])
+    await ctx.send(f"✅ {match[1]} ({match[0]}) was removed, {len(roster)} athletes are left on the roster.")
 
 # Event to notify when bot is ready
 @bot.event
 async def on_ready():
     """This event is triggered when the bot is online and ready."""
     print(f'✅ {bot.user.name} is now online!')
-    
-    # Get the user by their Discord ID
-    user = await bot.fetch_user(OWNER_ID)
+    if not warm_reports.is_running():
+        warm_reports.start()
+    if METRICS_PATH and not dump_metrics.is_running():
+        dump_metrics.start()
+    if WARM_STATE_PATH and not save_warm_state.is_running():
+        save_warm_state.start()
+    # The owner DM is only a courtesy, so it must not hold up the rest of startup
+    spawn_background(notify_owner_online())
+
+
+async def notify_owner_online():
+    try:
+        # Get the user by their Discord ID
+        user = await bot.fetch_user(OWNER_ID)
+    except discord.HTTPException:
+        user = None
     if user:
         try:
             await user.send(f"🚀 **The bot is now online!**\nI'm ready to handle commands!")
@@ -540,6 +3045,70 @@ async def on_ready():
     else:
         print("❌ User not found. Double-check the user ID.")
 
+
+def hit_ratio(hits: float, total: float) -> str:
+    return f"{hits / total:.0%} ({hits:g}/{total:g})" if total else "-"
+
+
+def format_stats() -> str:
+    uptime = int(time.time() - metrics.started)
+    response = f"**Bot stats** (up {uptime // 3600}h {uptime % 3600 // 60}m)\n"
+
+    response += "```\n"
+    response += f"{'Command':<14} | {'Runs':>5} | {'p50 ms':>8} | {'p95 ms':>8}\n"
+    response += "-" * 44 + "\n"
+    for labels, h in metrics.series("ted_command_seconds"):
+        name = labels["command"] + ("" if labels["outcome"] == "ok" else " (err)")
+        response += f"{name:<14} | {h.count:>5} | {h.quantile(0.5) * 1000:>8.1f} | {h.quantile(0.95) * 1000:>8.1f}\n"
+    response += "```\n"
+
+    response += "```\n"
+    response += f"{'Report stage':<30} | {'p50 ms':>8} | {'p95 ms':>8}\n"
+    response += "-" * 52 + "\n"
+    for labels, h in metrics.series("ted_report_stage_seconds"):
+        name = f"{labels['report'].replace('get_', '')}/{labels['stage']}"
+        response += f"{name:<30} | {h.quantile(0.5) * 1000:>8.1f} | {h.quantile(0.95) * 1000:>8.1f}\n"
+    for labels, h in metrics.series("ted_compute_seconds"):
+        name = f"{labels['pool']} {labels['stage']}"
+        response += f"{name:<30} | {h.quantile(0.5) * 1000:>8.1f} | {h.quantile(0.95) * 1000:>8.1f}\n"
+    response += "```\n"
+
+    response += "```\n"
+    response += f"{'intervals.icu':<30} | {'Calls':>6} | {'Avg ms':>7} | {'KB':>8}\n"
+    response += "-" * 60 + "\n"
+    endpoints = {}
+    for labels, h in metrics.series("ted_icu_request_seconds"):
+        calls, seconds = endpoints.get(labels["endpoint"], (0, 0.0))
+        endpoints[labels["endpoint"]] = (calls + h.count, seconds + h.sum)
+    for endpoint, (calls, seconds) in endpoints.items():
+        kb = metrics.total("ted_icu_bytes_total", endpoint=endpoint) / 1024
+        response += f"{endpoint:<30} | {calls:>6} | {seconds / calls * 1000:>7.1f} | {kb:>8.1f}\n"
+    response += f"Retries: {metrics.total('ted_icu_retries_total'):g}, "
+    response += f"failed requests: {metrics.total('ted_icu_failures_total'):g}\n"
+    response += "```\n"
+
+    reports = metrics.total("ted_report_requests_total")
+    curves = metrics.total("ted_curve_cache_total")
+    syncs = metrics.total("ted_activity_sync_total")
+    renders = metrics.total("ted_render_cache_total")
+    response += "```\n"
+    response += "Cache          | Hit ratio\n"
+    response += "-" * 30 + "\n"
+    response += f"{'Reports':<14} | {hit_ratio(reports - metrics.total('ted_report_requests_total', result='miss'), reports)}\n"
+    response += f"{'Power curves':<14} | {hit_ratio(curves - metrics.total('ted_curve_cache_total', result='miss'), curves)}\n"
+    response += f"{'Activity sync':<14} | {hit_ratio(metrics.total('ted_activity_sync_total', result='hit'), syncs)}\n"
+    response += f"{'Rendering':<14} | {hit_ratio(metrics.total('ted_render_cache_total', result='hit'), renders)}\n"
+    response += "```"
+    return response
+
+
+@bot.command(name="stats")
+async def cmd_stats(ctx):
+    if ctx.author.id != OWNER_ID:
+        await ctx.send("Sorry, !stats is only available to the bot owner.")
+        return
+    await send_report(ctx, format_stats())
+
 @bot.command(name="ping")
 async def ping(ctx):
     await ctx.send("Pong! 🏓")
@@ -553,11 +3122,12 @@ async def ping(ctx):
             print(f"❌ Failed to send DM: {e}")
     else:
         print("❌ User not found. Double-check the user ID.")
-# Debug prints (optional)
-# print(get_weekly_highlights(1))
-# print(get_year_to_date_stats())
-# print(get_summary(6))
-# print(get_personal_bests())
+# Debug prints (optional), for the default roster
+# roster = tuple(ATHLETE_IDS.items())
+# print(asyncio.run(get_weekly_highlights(roster, 1)))
+# print(asyncio.run(get_year_to_date_stats(roster)))
+# print(asyncio.run(get_summary(roster, 6)))
+# print(asyncio.run(get_personal_bests(roster)))
 
 # Uncomment to run the bot
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+"""JSONArrayStream must decode the same items however the body is split into chunks.
+
+    python -m unittest test_json_stream
+"""
+import json
+import os
+import tempfile
+import unittest
+
+# ted reads its configuration at import time
+os.environ.setdefault("DISCORD_OWNER_ID", "0")
+os.environ["ACTIVITY_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="ted-test-"), "activities.db")
+
+from ted import JSONArrayStream  # noqa: E402
+
+
+def decode_in_chunks(body: bytes, size: int) -> list:
+    stream = JSONArrayStream()
+    items = []
+    for start in range(0, len(body), size):
+        items.extend(stream.feed(body[start:start + size]))
+    items.extend(stream.feed(b"", final=True))
+    return items
+
+
+class JSONArrayStreamTest(unittest.TestCase):
+    BODIES = [
+        [],
+        [4.5, -12, 1e-3, 2.5E+10, 0, 123456789],
+        [True, False, None, "a,]\\\"b", "snø 🚴"],
+        [{"id": "i1", "distance": 1234.5, "zones": [1, 2, 3]}, {"nested": {"a": [{}]}}, []],
+        [1, "two", {"three": 3.0}, [4], 5.25],
+    ]
+
+    def test_every_chunk_size(self):
+        for value in self.BODIES:
+            for body in (json.dumps(value).encode(), json.dumps(value, indent=2, ensure_ascii=False).encode()):
+                for size in range(1, len(body) + 1):
+                    with self.subTest(body=body, size=size):
+                        self.assertEqual(decode_in_chunks(body, size), value)
+
+    def test_items_arrive_before_the_array_ends(self):
+        stream = JSONArrayStream()
+        self.assertEqual(stream.feed(b'[{"id": 1}, {"id"'), [{"id": 1}])
+        self.assertEqual(stream.feed(b': 2}, 3'), [{"id": 2}])
+        self.assertEqual(stream.feed(b']'), [3])
+
+    def test_number_cut_at_fraction_or_exponent(self):
+        for first, second, expected in ((b"[4.", b"5]", 4.5), (b"[1e", b"3]", 1000.0), (b"[-", b"7]", -7)):
+            with self.subTest(first=first):
+                stream = JSONArrayStream()
+                self.assertEqual(stream.feed(first), [])
+                self.assertEqual(stream.feed(second) + stream.feed(b"", final=True), [expected])
+
+    def test_malformed_input(self):
+        for body in (b'{"id": 1}', b"[1, 2", b'[{"id": 1} {"id": 2}]', b"[4x]", b"[tru]"):
+            with self.subTest(body=body):
+                with self.assertRaises(ValueError):
+                    decode_in_chunks(body, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()